@@ -18,7 +18,9 @@ from aird.constants import (
 # Module-level variables to hold configuration
 CONFIG_FILE = None
 ROOT_DIR = os.getcwd()
+REAL_ROOT_DIR = os.path.realpath(ROOT_DIR)
 PORT = None
+WORKERS = 1
 ACCESS_TOKEN = None
 ADMIN_TOKEN = None
 LDAP_ENABLED = False
@@ -111,7 +113,7 @@ def init_config():
     Initializes the application configuration by parsing command-line arguments,
     reading a config file, and setting environment variables.
     """
-    global CONFIG_FILE, ROOT_DIR, PORT, ACCESS_TOKEN, ADMIN_TOKEN, LDAP_ENABLED, LDAP_SERVER
+    global CONFIG_FILE, ROOT_DIR, REAL_ROOT_DIR, PORT, WORKERS, ACCESS_TOKEN, ADMIN_TOKEN, LDAP_ENABLED, LDAP_SERVER
     global LDAP_BASE_DN, LDAP_USER_TEMPLATE, LDAP_FILTER_TEMPLATE, LDAP_ATTRIBUTES
     global LDAP_ATTRIBUTE_MAP, HOSTNAME, SSL_CERT, SSL_KEY, ADMIN_USERS, FEATURE_FLAGS, CLOUD_MANAGER
 
@@ -119,6 +121,7 @@ def init_config():
     parser.add_argument("--config", help="Path to JSON config file")
     parser.add_argument("--root", help="Root directory to serve")
     parser.add_argument("--port", type=int, help="Port to listen on")
+    parser.add_argument("--workers", type=int, help="Worker processes to fork (0 = one per CPU, default 1). P2P rooms and connection limits are per worker, and admin upload settings take up to a second to reach every worker")
     parser.add_argument("--token", help="Access token for login")
     parser.add_argument("--admin-token", help="Access token for admin login")
     parser.add_argument("--ldap", action="store_true", help="Enable LDAP authentication")
@@ -143,7 +146,10 @@ def init_config():
     _configure_cloud_providers(config)
 
     ROOT_DIR = args.root or config.get("root") or os.getcwd()
+    # Resolved once here; is_within_root checks against it on every request
+    REAL_ROOT_DIR = os.path.realpath(ROOT_DIR)
     PORT = args.port or config.get("port") or 8000
+    WORKERS = args.workers if args.workers is not None else config.get("workers", 1)
 
     token_provided_explicitly = bool(args.token or config.get("token") or os.environ.get("AIRD_ACCESS_TOKEN"))
     admin_token_provided_explicitly = bool(args.admin_token or config.get("admin_token"))
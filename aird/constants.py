@@ -11,6 +11,8 @@ DB_CONN = None
 DB_PATH = None
 CLOUD_MANAGER = CloudManager()
 CLOUD_SHARE_FOLDER = ".aird_cloud"
+# Uploads are staged here under ROOT_DIR; it is never listed, searched or served
+UPLOAD_STAGING_FOLDER = ".aird_tmp"
 
 # Default feature flags (can be overridden by config.json or database)
 FEATURE_FLAGS = {
@@ -49,6 +51,7 @@ MAX_UPLOAD_FILE_SIZE_HARD_LIMIT = 10 * 1024 * 1024 * 1024  # 10 GB
 # File operation constants (derived from UPLOAD_CONFIG at startup)
 MAX_FILE_SIZE = UPLOAD_CONFIG["max_file_size_mb"] * 1024 * 1024
 MAX_READABLE_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
+MAX_PREVIEW_SIZE = 5 * 1024 * 1024  # 5 MB shown in the file viewer before truncating
 # Default whitelist for uploads; also used as the list of options in admin when "allow all" is off
 ALLOWED_UPLOAD_EXTENSIONS = {
     ".txt", ".log", ".md", ".json", ".xml", ".yaml", ".yml", ".csv",
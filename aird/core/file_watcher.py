@@ -0,0 +1,84 @@
+"""inotify-based change notification so file tailing doesn't have to poll."""
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import sys
+
+import tornado.ioloop
+
+IN_MODIFY = 0x00000002
+
+def _load_inotify():
+    """Bind inotify_init1 and inotify_add_watch from libc, or return None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        init1 = libc.inotify_init1
+        init1.argtypes = [ctypes.c_int]
+        add_watch = libc.inotify_add_watch
+        add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError, TypeError):
+        # No usable libc (find_library can return None, which CDLL rejects
+        # with TypeError); callers fall back to polling
+        return None
+    return init1, add_watch
+
+
+_inotify = _load_inotify()
+INOTIFY_AVAILABLE = _inotify is not None
+_inotify_init1, _inotify_add_watch = _inotify or (None, None)
+
+
+class FileWatcher:
+    """Wake waiters when a file is modified, via an inotify fd on the IOLoop."""
+
+    def __init__(self, fd: int):
+        self._fd = fd
+        self._changed = asyncio.Event()
+        tornado.ioloop.IOLoop.current().add_handler(fd, self._on_events, tornado.ioloop.IOLoop.READ)
+
+    @classmethod
+    def create(cls, path: str) -> "FileWatcher | None":
+        """Return a watcher for path, or None if inotify is unavailable."""
+        if not INOTIFY_AVAILABLE:
+            return None
+        fd = _inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if _inotify_add_watch(fd, os.fsencode(path), IN_MODIFY) < 0:
+            os.close(fd)
+            return None
+        return cls(fd)
+
+    def _on_events(self, fd, events):
+        # Drain every queued event; we only care that something changed
+        try:
+            while os.read(fd, 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        self._changed.set()
+
+    async def wait(self, timeout: float | None = None) -> bool:
+        """Wait until the file changes. Returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._changed.clear()
+
+    def close(self) -> None:
+        """Stop watching and release anyone blocked in wait()."""
+        if self._fd is None:
+            return
+        try:
+            tornado.ioloop.IOLoop.current().remove_handler(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._changed.set()
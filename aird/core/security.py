@@ -39,7 +39,10 @@ def is_within_root(path: str, root: str) -> bool:
     try:
         path_real = os.path.realpath(path)
         root_real = os.path.realpath(root)
-        return os.path.commonpath([path_real, root_real]) == root_real
+        if path_real == root_real:
+            return True
+        # Plain prefix test; the trailing separator keeps "/data2" out of "/data"
+        return path_real.startswith(root_real.rstrip(os.sep) + os.sep)
     except Exception:
         return False
 
@@ -11,7 +11,8 @@ import concurrent.futures
 from collections import deque
 from urllib.parse import unquote
 
-from aird.handlers.base_handler import BaseHandler
+from aird.handlers.base_handler import BaseHandler, authenticate_request
+from aird.core.file_watcher import FileWatcher
 from aird.db import (
     search_users,
     get_shares_for_path,
@@ -30,6 +31,9 @@ from aird.utils.util import (
     evaluate_expression,
     is_feature_enabled,
     get_current_feature_flags,
+    nofollow_opener,
+    safe_resolve,
+    is_upload_staging_path,
 )
 from aird.config import (
     ROOT_DIR,
@@ -38,6 +42,21 @@ from aird.config import (
     MAX_READABLE_FILE_SIZE,
 )
 import aird.constants as constants_module
+from aird.constants import UPLOAD_STAGING_FOLDER
+
+
+def _tail_n(f, n=100, block=65536):
+    """Return the last n lines of binary file f, reading backwards from its end."""
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    buf = b''
+    # One newline more than n guarantees the oldest kept line is complete
+    while pos > 0 and buf.count(b'\n') <= n:
+        step = min(block, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+    return [line.decode('utf-8', errors='replace') for line in buf.splitlines(keepends=True)[-n:]]
 
 
 class FeatureFlagSocketHandler(tornado.websocket.WebSocketHandler):
@@ -127,6 +146,12 @@ class FeatureFlagSocketHandler(tornado.websocket.WebSocketHandler):
 class FileStreamHandler(tornado.websocket.WebSocketHandler):
     # Use connection manager with configurable limits for file streaming
     connection_manager = WebSocketConnectionManager("file_streaming", default_max_connections=200, default_idle_timeout=300)
+    # Upper bounds for the lines coalesced into a single outgoing message
+    STREAM_BATCH_MAX_LINES = 256
+    STREAM_BATCH_MAX_BYTES = 64 * 1024
+    # Polling interval bounds when inotify is unavailable
+    STREAM_POLL_MIN_DELAY = 0.05
+    STREAM_POLL_MAX_DELAY = 1.0
 
     def __init__(self, application, request, **kwargs):
         super().__init__(application, request, **kwargs)
@@ -136,10 +161,16 @@ class FileStreamHandler(tornado.websocket.WebSocketHandler):
         self.line_buffer = deque(maxlen=1000)  # Default buffer size
         self.filter_expression = None
         self.stop_event = asyncio.Event()
+        self.watcher = None
+        self._stream_task = None
+        self._poll_delay = self.STREAM_POLL_MIN_DELAY
 
     def get_current_user(self):
-        # Use parent class implementation which handles authentication properly
-        return super().get_current_user()
+        # WebSocketHandler has no auth of its own, so resolve the user the way
+        # BaseHandler does and keep it for the lifetime of the connection
+        if not hasattr(self, '_cached_user'):
+            self._cached_user = authenticate_request(self)
+        return self._cached_user
 
     async def open(self, path):
         if not self.get_current_user():
@@ -154,22 +185,38 @@ class FileStreamHandler(tornado.websocket.WebSocketHandler):
             self.close(code=1013, reason="Connection limit exceeded")
             return
 
-        self.file_path = os.path.abspath(os.path.join(ROOT_DIR, unquote(path)))
-        if not is_within_root(self.file_path, ROOT_DIR) or not os.path.isfile(self.file_path):
+        # Keep the resolved path and refuse a symlink there when opening, so the
+        # file can't be swapped out between this check and the open below
+        self.file_path = safe_resolve(ROOT_DIR, unquote(path))
+        if self.file_path is None or is_upload_staging_path(self.file_path, ROOT_DIR) or not os.path.isfile(self.file_path):
             self.close(code=1003, reason="File not found")
             return
         
+        # One handle serves both the initial tail and the live stream
+        try:
+            self.file = await asyncio.to_thread(
+                open, self.file_path, 'r', encoding='utf-8', errors='replace', opener=nofollow_opener
+            )
+        except OSError:
+            self.close(code=1003, reason="File not found")
+            return
+
         # Initialize with last N lines
         try:
-            with open(self.file_path, 'r', encoding='utf-8', errors='replace') as f:
-                self.line_buffer.extend(f)
-            for line in self.line_buffer:
-                self.write_message(json.dumps({'type': 'line', 'data': line.strip()}))
+            # Only the tail is kept, so don't read the whole file to find it
+            self.line_buffer.extend(await asyncio.to_thread(_tail_n, self.file.buffer, self.line_buffer.maxlen))
+            if self.line_buffer:
+                self.write_message(json.dumps({'type': 'lines', 'data': [line.strip() for line in self.line_buffer]}))
         except Exception:
             pass
+        # Seeking the text layer also resets it after the raw reads above
+        self.file.seek(0, os.SEEK_END)
 
-        self.is_streaming = True
-        asyncio.create_task(self.stream_file())
+        # Wake on inotify events instead of polling; None means fall back to polling
+        self.watcher = FileWatcher.create(self.file_path)
+        # Batches are already coalesced, so don't let Nagle hold them back
+        self.set_nodelay(True)
+        self._start_streaming()
 
     async def on_message(self, message):
         try:
@@ -194,8 +241,7 @@ class FileStreamHandler(tornado.websocket.WebSocketHandler):
             self.stop_event.set()
             return
         if action == 'start':
-            self.is_streaming = True
-            asyncio.create_task(self.stream_file())
+            self._start_streaming()
             return
         if action == 'lines':
             try:
@@ -235,29 +281,30 @@ class FileStreamHandler(tornado.websocket.WebSocketHandler):
             'message': 'Unknown action'
         }))
 
+    def _start_streaming(self):
+        self.is_streaming = True
+        self.stop_event.clear()
+        # One tail task per connection; a repeated 'start' reuses the live one
+        if self._stream_task is None or self._stream_task.done():
+            self._stream_task = asyncio.create_task(self.stream_file())
+
     async def stream_file(self):
         try:
-            with open(self.file_path, 'r', encoding='utf-8', errors='replace') as self.file:
-                self.file.seek(0, 2)  # Go to the end of the file
-                while self.is_streaming:
-                    line = self.file.readline()
-                    if not line:
-                        await asyncio.sleep(0.1)
-                        continue
-                    
-                    if self.filter_expression:
-                        try:
-                            parsed_expr = parse_expression(self.filter_expression)
-                            if evaluate_expression(line, parsed_expr):
-                                self.write_message(json.dumps({'type': 'line', 'data': line.strip()}))
-                        except Exception:
-                            # If filter is invalid, ignore it
-                            self.write_message(json.dumps({'type': 'line', 'data': line.strip()}))
-                    else:
-                        self.write_message(json.dumps({'type': 'line', 'data': line.strip()}))
+            # self.file was positioned at EOF by open() and is closed in on_close()
+            while self.is_streaming:
+                lines = self._read_available_lines()
+                if not lines:
+                    await self._wait_for_change()
+                    continue
+                self._poll_delay = self.STREAM_POLL_MIN_DELAY
+
+                # One frame per wakeup rather than one per line
+                lines = self._filter_lines(lines)
+                if lines:
+                    self.write_message(json.dumps({'type': 'lines', 'data': [line.strip() for line in lines]}))
 
-                    if self.stop_event.is_set():
-                        break
+                if self.stop_event.is_set():
+                    break
         except (tornado.websocket.WebSocketClosedError, RuntimeError):
             pass
         except Exception as e:
@@ -266,9 +313,49 @@ class FileStreamHandler(tornado.websocket.WebSocketHandler):
             except tornado.websocket.WebSocketClosedError:
                 pass
 
+    def _read_available_lines(self):
+        """Read the lines already written to the file, bounded by count and size."""
+        lines = []
+        size = 0
+        while len(lines) < self.STREAM_BATCH_MAX_LINES and size < self.STREAM_BATCH_MAX_BYTES:
+            line = self.file.readline()
+            if not line:
+                break
+            lines.append(line)
+            size += len(line)
+        return lines
+
+    def _filter_lines(self, lines):
+        if not self.filter_expression:
+            return lines
+        try:
+            parsed_expr = parse_expression(self.filter_expression)
+            return [line for line in lines if evaluate_expression(line, parsed_expr)]
+        except Exception:
+            # If filter is invalid, ignore it
+            return lines
+
+    async def _wait_for_change(self):
+        if self.watcher is not None:
+            # The timeout bounds how long a stopped stream lingers
+            await self.watcher.wait(timeout=1.0)
+        else:
+            # Back off while the file is idle; new data resets the delay
+            await asyncio.sleep(self._poll_delay)
+            self._poll_delay = min(self._poll_delay * 2, self.STREAM_POLL_MAX_DELAY)
+
     def on_close(self):
         self.is_streaming = False
         self.stop_event.set()
+        if self._stream_task is not None:
+            self._stream_task.cancel()
+            self._stream_task = None
+        if self.watcher is not None:
+            try:
+                self.watcher.close()
+            except Exception:
+                pass
+            self.watcher = None
         try:
             if self.file:
                 self.file.close()
@@ -344,57 +431,10 @@ class SuperSearchWebSocketHandler(tornado.websocket.WebSocketHandler):
         self.stop_event = asyncio.Event()
 
     def get_current_user(self):
-        """Authenticate user for WebSocket connection"""
-        # Check for user session from secure cookie (same as BaseHandler)
-        user_json = self.get_secure_cookie("user")
-        if user_json:
-            try:
-                from aird.db import get_user_by_username
-                import aird.constants as constants_module
-                # Handle both JSON-encoded user data and plain string usernames
-                try:
-                    import json
-                    user_data = json.loads(user_json)
-                    username = user_data.get("username", "")
-                except (json.JSONDecodeError, TypeError):
-                    # If it's not JSON, treat it as a plain username string
-                    username = user_json.decode('utf-8') if isinstance(user_json, bytes) else str(user_json)
-                
-                # Re-verify user from DB to ensure they are still valid
-                db_conn = constants_module.DB_CONN
-                if db_conn:
-                    user = get_user_by_username(db_conn, username)
-                    if user:
-                        return user
-                # If DB check fails but we have a username, return basic user info for token-authenticated users
-                if username == "token_authenticated":
-                    return {"username": "token_user", "role": "admin"}
-            except Exception:
-                # If cookie parsing fails, check if it's a token-authenticated user
-                if isinstance(user_json, bytes):
-                    user_str = user_json.decode('utf-8', errors='ignore')
-                    if user_str == "token_authenticated":
-                        return {"username": "token_user", "role": "admin"}
-                return None
-        
-        # Fallback to token-based authentication from Authorization header
-        auth_header = self.request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-            # Access token directly from module to ensure we have the latest value
-            import aird.config as config_module
-            import secrets as secrets_module
-            current_access_token = config_module.ACCESS_TOKEN
-            if current_access_token:
-                # Use constant-time comparison to prevent timing attacks
-                # Only strip whitespace to preserve token integrity
-                normalized_token = token.strip()
-                normalized_access_token = current_access_token.strip()
-                if secrets_module.compare_digest(normalized_token, normalized_access_token):
-                    # Return a generic user object for token-based access
-                    return {"username": "token_user", "role": "admin"}
-        
-        return None
+        # Same cookie/bearer resolution as BaseHandler, kept for the connection
+        if not hasattr(self, '_cached_user'):
+            self._cached_user = authenticate_request(self)
+        return self._cached_user
 
     def open(self):
         user = self.get_current_user()
@@ -510,6 +550,8 @@ class SuperSearchWebSocketHandler(tornado.websocket.WebSocketHandler):
             for dirpath, dirnames, filenames in os.walk(root_path):
                 if self.stop_event.is_set():
                     raise asyncio.CancelledError
+                # Partial uploads aren't searchable
+                dirnames[:] = [d for d in dirnames if d != UPLOAD_STAGING_FOLDER]
                 
                 # Check each file against the pattern
                 for filename in filenames:
@@ -261,7 +261,8 @@ class LoginHandler(BaseHandler):
         # Safe logging without exposing token values
         logging.debug(f"Token comparison - lengths match: {len(normalized_token) == len(normalized_access_token)}")
         
-        if secrets.compare_digest(normalized_token, normalized_access_token):
+        # Compare bytes: compare_digest raises TypeError on non-ASCII str input
+        if secrets.compare_digest(normalized_token.encode(), normalized_access_token.encode()):
             logging.info(f"Token authentication successful, redirecting to: {next_url}")
             log_audit(constants_module.DB_CONN, "login", username="token_authenticated", ip=self.request.remote_ip)
             # Set cookies with 24-hour expiration for session security
@@ -350,7 +351,7 @@ class AdminLoginHandler(BaseHandler):
         # Debug logging (without exposing actual token values)
         logging.debug(f"Admin token auth attempt - submitted length: {len(normalized_token)}, expected length: {len(normalized_admin_token)}")
         
-        if secrets.compare_digest(normalized_token, normalized_admin_token):
+        if secrets.compare_digest(normalized_token.encode(), normalized_admin_token.encode()):
             logging.info("Admin token authentication successful")
             log_audit(constants_module.DB_CONN, "admin_login", username="admin_token", ip=self.request.remote_ip)
             # Set cookie with 24-hour expiration for session security
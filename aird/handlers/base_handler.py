@@ -7,6 +7,81 @@ from aird.utils.util import *
 import aird.config as config_module
 
 
+def authenticate_request(handler):
+    """Resolve the user for a request from its secure cookie or bearer token.
+
+    Shared by BaseHandler and the file stream and super search WebSocket
+    handlers, which don't inherit from it.
+    """
+    # Check for user session from secure cookie
+    user_json = handler.get_secure_cookie("user")
+    if user_json:
+        try:
+            from aird.db import get_user_by_username
+            import aird.constants as constants_module
+            # Handle both JSON-encoded user data and plain string usernames
+            try:
+                user_data = json.loads(user_json)
+                username = user_data.get("username", "")
+            except (json.JSONDecodeError, TypeError):
+                # If it's not JSON, treat it as a plain username string
+                username = user_json.decode('utf-8') if isinstance(user_json, bytes) else str(user_json)
+            
+            # Re-verify user from DB to ensure they are still valid
+            db_conn = constants_module.DB_CONN
+            if db_conn:
+                user = get_user_by_username(db_conn, username)
+                if user:
+                    return user
+            # If DB check fails but we have a username, return basic user info for token-authenticated users
+            if username == "token_authenticated":
+                return {"username": "token_user", "role": "admin"}
+        except Exception:
+            # If cookie parsing fails, check if it's a token-authenticated user
+            if isinstance(user_json, bytes):
+                user_str = user_json.decode('utf-8', errors='ignore')
+                if user_str == "token_authenticated":
+                    return {"username": "token_user", "role": "admin"}
+            return None
+    
+    # Fallback to token-based authentication from Authorization header
+    auth_header = handler.request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        token = auth_header.split(" ")[1]
+        # Access token directly from module to ensure we have the latest value
+        current_access_token = config_module.ACCESS_TOKEN
+        if current_access_token:
+            # Use constant-time comparison to prevent timing attacks
+            # Only strip whitespace to preserve token integrity
+            normalized_token = token.strip()
+            normalized_access_token = current_access_token.strip()
+            if secrets.compare_digest(normalized_token.encode(), normalized_access_token.encode()):
+                # Return a generic user object for token-based access
+                return {"username": "token_user", "role": "admin"}
+    
+    return None
+
+
+class FeatureFlagGZipContentEncoding(tornado.web.GZipContentEncoding):
+    """Tornado's gzip transform, skipped while the admin "compression" flag is off."""
+
+    def __init__(self, request):
+        super().__init__(request)
+        self._compression_enabled = True
+
+    def transform_first_chunk(self, status_code, headers, chunk, finishing):
+        # Checked once the response starts, so a toggle applies to the next response
+        self._compression_enabled = is_feature_enabled("compression", True)
+        if not self._compression_enabled:
+            return status_code, headers, chunk
+        return super().transform_first_chunk(status_code, headers, chunk, finishing)
+
+    def transform_chunk(self, chunk, finishing):
+        if not self._compression_enabled:
+            return chunk
+        return super().transform_chunk(chunk, finishing)
+
+
 class BaseHandler(tornado.web.RequestHandler):
     def prepare(self):
         """Generate a unique nonce for this request for CSP."""
@@ -46,53 +121,11 @@ class BaseHandler(tornado.web.RequestHandler):
         return namespace
 
     def get_current_user(self):
-        # Check for user session from secure cookie
-        user_json = self.get_secure_cookie("user")
-        if user_json:
-            try:
-                from aird.db import get_user_by_username
-                import aird.constants as constants_module
-                # Handle both JSON-encoded user data and plain string usernames
-                try:
-                    user_data = json.loads(user_json)
-                    username = user_data.get("username", "")
-                except (json.JSONDecodeError, TypeError):
-                    # If it's not JSON, treat it as a plain username string
-                    username = user_json.decode('utf-8') if isinstance(user_json, bytes) else str(user_json)
-                
-                # Re-verify user from DB to ensure they are still valid
-                db_conn = constants_module.DB_CONN
-                if db_conn:
-                    user = get_user_by_username(db_conn, username)
-                    if user:
-                        return user
-                # If DB check fails but we have a username, return basic user info for token-authenticated users
-                if username == "token_authenticated":
-                    return {"username": "token_user", "role": "admin"}
-            except Exception:
-                # If cookie parsing fails, check if it's a token-authenticated user
-                if isinstance(user_json, bytes):
-                    user_str = user_json.decode('utf-8', errors='ignore')
-                    if user_str == "token_authenticated":
-                        return {"username": "token_user", "role": "admin"}
-                return None
-        
-        # Fallback to token-based authentication from Authorization header
-        auth_header = self.request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-            # Access token directly from module to ensure we have the latest value
-            current_access_token = config_module.ACCESS_TOKEN
-            if current_access_token:
-                # Use constant-time comparison to prevent timing attacks
-                # Only strip whitespace to preserve token integrity
-                normalized_token = token.strip()
-                normalized_access_token = current_access_token.strip()
-                if secrets.compare_digest(normalized_token, normalized_access_token):
-                    # Return a generic user object for token-based access
-                    return {"username": "token_user", "role": "admin"}
-        
-        return None
+        # Verifying the cookie costs an HMAC and a DB lookup, and helpers like
+        # get_display_username() and is_admin_user() ask again within a request
+        if not hasattr(self, '_cached_user'):
+            self._cached_user = authenticate_request(self)
+        return self._cached_user
 
     def write_error(self, status_code, **kwargs):
         # Custom error page rendering
@@ -10,7 +10,7 @@ import asyncio
 import aiofiles
 
 from aird.handlers.base_handler import BaseHandler
-from aird.utils.util import is_within_root, is_feature_enabled, sanitize_cloud_filename
+from aird.utils.util import is_within_root, is_feature_enabled, safe_resolve, sanitize_cloud_filename
 from aird.db import log_audit
 import aird.constants as constants_module
 from aird.config import (
@@ -18,6 +18,7 @@ from aird.config import (
     ALLOWED_UPLOAD_EXTENSIONS,
     CLOUD_MANAGER,
 )
+from aird.constants import UPLOAD_STAGING_FOLDER
 from aird.cloud import CloudManager, CloudProviderError
 from io import BytesIO
 
@@ -44,6 +45,13 @@ class UploadHandler(BaseHandler):
             self._reject_reason = "File upload is disabled."
             return
 
+        # prepare() runs before @authenticated on post(), so don't stage
+        # anything in the served tree for an anonymous client
+        if not self.current_user:
+            self._reject = True
+            self._reject_reason = "Authentication required"
+            return
+
         # Read and decode headers provided by client
         self.upload_dir = self.request.headers.get("X-Upload-Dir", "")
         self.filename = self.request.headers.get("X-Upload-Filename", "")
@@ -54,12 +62,26 @@ class UploadHandler(BaseHandler):
             self._reject_reason = "Missing X-Upload-Filename header"
             return
 
-        # Create temporary file for streamed writes
-        fd, self._temp_path = tempfile.mkstemp(prefix="aird_upload_")
+        # Create temporary file for streamed writes. Staging it on the served
+        # filesystem makes the final move a rename instead of a second copy.
+        fd, self._temp_path = self._create_temp_file()
         # Close the low-level fd; we'll use aiofiles on the path
         os.close(fd)
         self._aiofile = await aiofiles.open(self._temp_path, "wb")
 
+    def _create_temp_file(self):
+        # A hidden folder kept out of listings, search and downloads, so other
+        # users never see partial uploads
+        staging_dir = safe_resolve(ROOT_DIR, UPLOAD_STAGING_FOLDER)
+        if staging_dir:
+            try:
+                os.makedirs(staging_dir, exist_ok=True)
+                return tempfile.mkstemp(prefix="aird_upload_", dir=staging_dir)
+            except OSError:
+                pass
+        # Root not writable; the final move becomes a copy
+        return tempfile.mkstemp(prefix="aird_upload_")
+
     def data_received(self, chunk: bytes) -> None:
         if self._reject:
             return
@@ -121,8 +143,8 @@ class UploadHandler(BaseHandler):
             return
 
         # Enhanced path validation
-        safe_dir_abs = os.path.realpath(os.path.join(ROOT_DIR, self.upload_dir.strip("/")))
-        if not is_within_root(safe_dir_abs, ROOT_DIR):
+        safe_dir_abs = safe_resolve(ROOT_DIR, self.upload_dir.strip("/"))
+        if safe_dir_abs is None:
             self.set_status(403)
             self.write("Access denied: This path is not allowed for security reasons")
             return
@@ -150,8 +172,8 @@ class UploadHandler(BaseHandler):
             self.write("Filename too long: Please use a shorter filename")
             return
 
-        final_path_abs = os.path.realpath(os.path.join(safe_dir_abs, safe_filename))
-        if not is_within_root(final_path_abs, safe_dir_abs):
+        final_path_abs = safe_resolve(safe_dir_abs, safe_filename)
+        if final_path_abs is None:
             self.set_status(403)
             self.write("Access denied: This path is not allowed for security reasons")
             return
@@ -159,7 +181,7 @@ class UploadHandler(BaseHandler):
         os.makedirs(os.path.dirname(final_path_abs), exist_ok=True)
 
         try:
-            shutil.move(self._temp_path, final_path_abs)
+            await asyncio.to_thread(shutil.move, self._temp_path, final_path_abs)
             self._moved = True
         except Exception as e:
             logging.error(f"Upload save failed: {e}")
@@ -173,6 +195,29 @@ class UploadHandler(BaseHandler):
 
     def on_finish(self) -> None:
         # Clean up temp file on failures
+        self._remove_temp_file()
+
+    def on_connection_close(self) -> None:
+        # on_finish() never runs when the client aborts mid-body, and the
+        # staged file sits in the user's directory, so discard it here
+        super().on_connection_close()
+        if getattr(self, "_temp_path", None) and not getattr(self, "_moved", False):
+            asyncio.ensure_future(self._discard_upload())
+
+    async def _discard_upload(self) -> None:
+        if self._writer_task is not None:
+            try:
+                await self._writer_task
+            except Exception:
+                pass
+        if self._aiofile is not None:
+            try:
+                await self._aiofile.close()
+            except Exception:
+                pass
+        self._remove_temp_file()
+
+    def _remove_temp_file(self) -> None:
         try:
             if getattr(self, "_temp_path", None) and not getattr(self, "_moved", False):
                 if os.path.exists(self._temp_path):
@@ -235,7 +280,7 @@ def path_to_rel(abspath):
 
 class DeleteHandler(BaseHandler):
     @tornado.web.authenticated
-    def post(self):
+    async def post(self):
         path = self.get_argument("path", "")
         abspath = os.path.abspath(os.path.join(ROOT_DIR, path))
         root = ROOT_DIR
@@ -253,14 +298,15 @@ class DeleteHandler(BaseHandler):
                 self.set_status(400)
                 self.write("Folder is not empty: use recursive=1 to delete anyway")
                 return
-            shutil.rmtree(abspath)
+            # A large tree walk would otherwise block every other connection
+            await asyncio.to_thread(shutil.rmtree, abspath)
             log_audit(constants_module.DB_CONN, "folder_delete", username=self.get_display_username(), details=path_to_rel(abspath), ip=self.request.remote_ip)
         elif os.path.isfile(abspath):
             if not is_feature_enabled("file_delete", True):
                 self.set_status(403)
                 self.write("Feature disabled: File deletion is currently disabled by administrator")
                 return
-            os.remove(abspath)
+            await asyncio.to_thread(os.remove, abspath)
             log_audit(constants_module.DB_CONN, "file_delete", username=self.get_display_username(), details=path_to_rel(abspath), ip=self.request.remote_ip)
         else:
             self.set_status(404)
@@ -275,7 +321,7 @@ class DeleteHandler(BaseHandler):
 
 class RenameHandler(BaseHandler):
     @tornado.web.authenticated
-    def post(self):
+    async def post(self):
         if not is_feature_enabled("file_rename", True):
             self.set_status(403)
             self.write("Feature disabled: File renaming is currently disabled by administrator")
@@ -301,8 +347,9 @@ class RenameHandler(BaseHandler):
             self.write("Filename too long: Please use a shorter filename")
             return
         
+        parent = os.path.dirname(path)
         abspath = os.path.abspath(os.path.join(ROOT_DIR, path))
-        new_abspath = os.path.abspath(os.path.join(ROOT_DIR, os.path.dirname(path), new_name))
+        new_abspath = os.path.abspath(os.path.join(ROOT_DIR, parent, new_name))
         root = ROOT_DIR
         if not (is_within_root(abspath, root) and is_within_root(new_abspath, root)):
             self.set_status(403)
@@ -315,14 +362,13 @@ class RenameHandler(BaseHandler):
             return
             
         try:
-            os.rename(abspath, new_abspath)
+            await asyncio.to_thread(os.rename, abspath, new_abspath)
         except OSError:
             self.set_status(500)
             self.write("Operation failed: Unable to rename the file")
             return
 
         log_audit(constants_module.DB_CONN, "rename", username=self.get_display_username(), details=f"{path} -> {new_name}", ip=self.request.remote_ip)
-        parent = os.path.dirname(path)
         if self.request.headers.get("Accept") == "application/json":
             self.set_header("Content-Type", "application/json")
             self.write({"ok": True})
@@ -332,7 +378,7 @@ class RenameHandler(BaseHandler):
 
 class CopyHandler(BaseHandler):
     @tornado.web.authenticated
-    def post(self):
+    async def post(self):
         if not is_feature_enabled("file_rename", True):
             self.set_status(403)
             self.write("Feature disabled: Copy is currently disabled by administrator")
@@ -359,9 +405,9 @@ class CopyHandler(BaseHandler):
             return
         try:
             if os.path.isdir(src_abs):
-                shutil.copytree(src_abs, dest_abs)
+                await asyncio.to_thread(shutil.copytree, src_abs, dest_abs)
             else:
-                shutil.copy2(src_abs, dest_abs)
+                await asyncio.to_thread(shutil.copy2, src_abs, dest_abs)
         except OSError as e:
             logging.error("Copy error: %s", e)
             self.set_status(500)
@@ -372,12 +418,13 @@ class CopyHandler(BaseHandler):
             self.set_header("Content-Type", "application/json")
             self.write({"ok": True})
             return
-        self.redirect("/files/" + os.path.dirname(dest) if os.path.dirname(dest) else "/files/")
+        dest_parent = os.path.dirname(dest)
+        self.redirect("/files/" + dest_parent if dest_parent else "/files/")
 
 
 class MoveHandler(BaseHandler):
     @tornado.web.authenticated
-    def post(self):
+    async def post(self):
         if not is_feature_enabled("file_rename", True):
             self.set_status(403)
             self.write("Feature disabled: Move is currently disabled by administrator")
@@ -403,7 +450,7 @@ class MoveHandler(BaseHandler):
             self.write("Destination already exists")
             return
         try:
-            shutil.move(src_abs, dest_abs)
+            await asyncio.to_thread(shutil.move, src_abs, dest_abs)
         except OSError as e:
             logging.error("Move error: %s", e)
             self.set_status(500)
@@ -414,12 +461,13 @@ class MoveHandler(BaseHandler):
             self.set_header("Content-Type", "application/json")
             self.write({"ok": True})
             return
-        self.redirect("/files/" + os.path.dirname(dest) if os.path.dirname(dest) else "/files/")
+        dest_parent = os.path.dirname(dest)
+        self.redirect("/files/" + dest_parent if dest_parent else "/files/")
 
 
 class BulkHandler(BaseHandler):
     @tornado.web.authenticated
-    def post(self):
+    async def post(self):
         try:
             data = json.loads(self.request.body.decode("utf-8", errors="replace") or "{}")
         except Exception:
@@ -453,7 +501,7 @@ class BulkHandler(BaseHandler):
                         err = "folder delete disabled"
                     else:
                         try:
-                            shutil.rmtree(abspath)
+                            await asyncio.to_thread(shutil.rmtree, abspath)
                             log_audit(constants_module.DB_CONN, "folder_delete", username=self.get_display_username(), details=path_to_rel(abspath), ip=self.request.remote_ip)
                         except OSError as e:
                             err = str(e)
@@ -462,7 +510,7 @@ class BulkHandler(BaseHandler):
                         err = "file delete disabled"
                     else:
                         try:
-                            os.remove(abspath)
+                            await asyncio.to_thread(os.remove, abspath)
                             log_audit(constants_module.DB_CONN, "file_delete", username=self.get_display_username(), details=path_to_rel(abspath), ip=self.request.remote_ip)
                         except OSError as e:
                             err = str(e)
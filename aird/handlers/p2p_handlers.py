@@ -3,7 +3,7 @@ import json
 import logging
 import secrets
 import time
-from typing import Dict, Optional, Set
+from typing import Dict, Optional
 
 import tornado.web
 import tornado.websocket
@@ -61,7 +61,7 @@ class ShareCreateHandler(BaseHandler):
         
         # Compare tokens
         # Compare tokens using constant-time comparison
-        if not secrets.compare_digest(provided_token, cookie_token):
+        if not secrets.compare_digest(provided_token.encode(), cookie_token.encode()):
             raise tornado.web.HTTPError(403, "XSRF cookie does not match POST argument")
     
     @tornado.web.authenticated
@@ -246,7 +246,7 @@ class ShareUpdateHandler(BaseHandler):
         
         # Compare tokens
         # Compare tokens using constant-time comparison
-        if not secrets.compare_digest(provided_token, cookie_token):
+        if not secrets.compare_digest(provided_token.encode(), cookie_token.encode()):
             raise tornado.web.HTTPError(403, "XSRF cookie does not match POST argument")
     
     @tornado.web.authenticated
@@ -521,7 +521,7 @@ class TokenVerificationHandler(BaseHandler):
                 self.write({"error": "Token is required"})
                 return
                 
-            if not secrets.compare_digest(provided_token, stored_token):
+            if not secrets.compare_digest(provided_token.encode(), stored_token.encode()):
                 self.set_status(403)
                 self.write({"error": "Invalid token"})
                 return
@@ -567,7 +567,7 @@ class SharedListHandler(BaseHandler):
                 cookie_name = f"share_token_{sid}"
                 provided_token = self.get_cookie(cookie_name)
             
-            if not provided_token or not secrets.compare_digest(provided_token, secret_token):
+            if not provided_token or not secrets.compare_digest(provided_token.encode(), secret_token.encode()):
                 # No valid token found, redirect to verification
                 self.redirect(f"/shared/{sid}/verify")
                 return
@@ -655,7 +655,7 @@ class SharedFileHandler(BaseHandler):
                 cookie_name = f"share_token_{sid}"
                 provided_token = self.get_cookie(cookie_name)
             
-            if not provided_token or not secrets.compare_digest(provided_token, secret_token):
+            if not provided_token or not secrets.compare_digest(provided_token.encode(), secret_token.encode()):
                 self.set_status(403)
                 self.write("Access denied: Invalid or expired access token")
                 return
@@ -1,13 +1,10 @@
 import tornado.web
+from tornado.iostream import IOStream, SSLIOStream
 import os
 import mimetypes
-import gzip
-from io import BytesIO
-import shutil
+import zlib
 import asyncio
 import aiofiles
-import mmap
-import concurrent.futures
 import logging
 from datetime import datetime
 
@@ -22,6 +19,8 @@ from aird.utils.util import (
     format_size,
     get_current_feature_flags,
     MMapFileHandler,
+    nofollow_opener,
+    is_upload_staging_path,
     sanitize_cloud_filename
 )
 from aird.config import (
@@ -30,10 +29,58 @@ from aird.config import (
     CLOUD_MANAGER,
 )
 import aird.constants as constants_module
-from aird.constants import CHUNK_SIZE
+from aird.constants import CHUNK_SIZE, MAX_PREVIEW_SIZE
 from aird.cloud import CloudManager, CloudProviderError
 
 
+def _gzip_next_chunk(f, compressor, chunk_size=CHUNK_SIZE):
+    """Read and compress the next chunk of f; return None at end of file."""
+    data = f.read(chunk_size)
+    if not data:
+        return None
+    return compressor.compress(data)
+
+
+def _plain_stream(handler):
+    """Return the connection's IOStream if its body can be sent with sendfile(2)."""
+    connection = getattr(handler.request, "connection", None)
+    stream = getattr(connection, "stream", None)
+    # TLS is encrypted in userspace, so those connections keep the chunked path
+    if not isinstance(stream, IOStream) or isinstance(stream, SSLIOStream):
+        return None
+    return stream
+
+
+async def _sendfile_body(handler, stream, abspath, size):
+    """Send the file as the response body with sendfile(2).
+
+    Returns False without sending anything if the caller should stream the
+    body itself instead.
+    """
+    loop = asyncio.get_running_loop()
+    # uvloop inherits AbstractEventLoop's stub, which only raises
+    # NotImplementedError, so check for a real implementation before flushing
+    if getattr(type(loop), "sock_sendfile", None) is asyncio.AbstractEventLoop.sock_sendfile:
+        return False
+    await handler.flush()
+    connection = handler.request.connection
+    # Only safe while Tornado frames the body by our Content-Length; a gzip
+    # transform or chunked encoding would have to see every byte
+    if getattr(connection, "_expected_content_remaining", None) != size:
+        return False
+    f = await asyncio.to_thread(open, abspath, 'rb', opener=nofollow_opener)
+    try:
+        sent = await loop.sock_sendfile(stream.socket, f, 0, size)
+    except OSError:
+        # Client went away mid-transfer
+        stream.close()
+        return True
+    finally:
+        f.close()
+    connection._expected_content_remaining -= sent
+    return True
+
+
 class RootHandler(BaseHandler):
     def get(self):
         self.redirect("/files/")
@@ -48,6 +95,11 @@ class MainHandler(BaseHandler):
             self.write("Access denied: You don't have permission to perform this action")
             return
 
+        if is_upload_staging_path(abspath, ROOT_DIR):
+            self.set_status(404)
+            self.write("File not found: The requested file may have been moved or deleted")
+            return
+
         if os.path.isdir(abspath):
             # Collect all shared paths from database
             all_shared_paths = set()
@@ -87,6 +139,15 @@ class MainHandler(BaseHandler):
     @staticmethod
     async def serve_file(handler, abspath):
         filename = os.path.basename(abspath)
+        # Resolve once and check that resolution, since the caller validated an
+        # earlier one. Every open below uses it and refuses a symlink in its
+        # place, so swapping the file while this coroutine awaits can't
+        # redirect reads.
+        realpath = os.path.realpath(abspath)
+        if not is_within_root(realpath, ROOT_DIR) or is_upload_staging_path(realpath, ROOT_DIR):
+            handler.set_status(403)
+            handler.write("Access denied: You don't have permission to perform this action")
+            return
         if handler.get_argument('download', None):
             if not is_feature_enabled("file_download", True):
                 handler.set_status(403)
@@ -106,25 +167,42 @@ class MainHandler(BaseHandler):
                 if any(mime_type.startswith(prefix) for prefix in compressible_types):
                     handler.set_header("Content-Encoding", "gzip")
 
-                    # Fallback to Python gzip compression with async I/O
-                    def compress_file():
-                        buffer = BytesIO()
-                        with open(abspath, 'rb') as f_in, gzip.GzipFile(fileobj=buffer, mode='wb') as f_out:
-                            shutil.copyfileobj(f_in, f_out)
-                        return buffer.getvalue()
-                    
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        compressed_data = await asyncio.get_event_loop().run_in_executor(
-                            executor, compress_file
-                        )
-
-                    handler.write(compressed_data)
+                    # Compress chunk by chunk in a worker thread so neither the
+                    # file nor its compressed form is ever held in memory whole
+                    compressor = zlib.compressobj(wbits=31)
+                    f_in = await asyncio.to_thread(open, realpath, 'rb', opener=nofollow_opener)
+                    try:
+                        while True:
+                            chunk = await asyncio.to_thread(_gzip_next_chunk, f_in, compressor)
+                            if chunk is None:
+                                break
+                            if chunk:
+                                handler.write(chunk)
+                                await handler.flush()
+                    finally:
+                        f_in.close()
+                    handler.write(compressor.flush())
                     await handler.flush()
                     return
 
+            # Known length lets the client show progress and keeps the connection alive
+            end = None
+            try:
+                file_size = os.path.getsize(abspath)
+                handler.set_header('Content-Length', str(file_size))
+                # A growing log must not overrun the length already advertised
+                end = file_size - 1
+            except OSError:
+                file_size = 0
+
+            # Zero-copy from the page cache to the socket on plain connections
+            stream = _plain_stream(handler)
+            if stream is not None and file_size:
+                if await _sendfile_body(handler, stream, realpath, file_size):
+                    return
+
             # Fallback to Python mmap implementation
-            async for chunk in MMapFileHandler.serve_file_chunk(abspath):
+            async for chunk in MMapFileHandler.serve_file_chunk(realpath, 0, end, opener=nofollow_opener):
                 handler.write(chunk)
                 await handler.flush()
             return
@@ -149,16 +227,23 @@ class MainHandler(BaseHandler):
                 
                 # Serve file using mmap or async read
                 file_size = os.path.getsize(abspath)
+                # The viewer asks for a preview; only the leading slice is read or mapped
+                limit = file_size
+                if handler.get_argument('preview', None):
+                    limit = min(file_size, MAX_PREVIEW_SIZE)
+                    handler.set_header('X-Aird-Truncated', '1' if limit < file_size else '0')
                 if MMapFileHandler.should_use_mmap(file_size):
-                     async for chunk in MMapFileHandler.serve_file_chunk(abspath):
+                     async for chunk in MMapFileHandler.serve_file_chunk(realpath, 0, limit - 1, opener=nofollow_opener):
                         handler.write(chunk)
                         await handler.flush()
                 else:
-                    async with aiofiles.open(abspath, 'rb') as f:
-                        while True:
-                            chunk = await f.read(CHUNK_SIZE)
+                    remaining = limit
+                    async with aiofiles.open(realpath, 'rb', opener=nofollow_opener) as f:
+                        while remaining > 0:
+                            chunk = await f.read(min(CHUNK_SIZE, remaining))
                             if not chunk:
                                 break
+                            remaining -= len(chunk)
                             handler.write(chunk)
                             await handler.flush()
                 return
@@ -228,39 +313,14 @@ class EditViewHandler(BaseHandler):
             return
 
         filename = os.path.basename(abspath)
-        
-        # Use async file loading to prevent blocking event loop
-        try:
-            file_size = os.path.getsize(abspath)
-            if MMapFileHandler.should_use_mmap(file_size):
-                # For large files, still use mmap but in a thread to avoid blocking
-                def read_mmap():
-                    with open(abspath, 'rb') as f:
-                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-                            return mm[:].decode('utf-8', errors='replace')
-                
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    full_file_content = await asyncio.get_event_loop().run_in_executor(
-                        executor, read_mmap
-                    )
-            else:
-                # Use aiofiles for small files
-                async with aiofiles.open(abspath, 'r', encoding='utf-8', errors='replace') as f:
-                    full_file_content = await f.read()
-        except (OSError, UnicodeDecodeError):
-            # Fallback to async read
-            async with aiofiles.open(abspath, 'r', encoding='utf-8', errors='replace') as f:
-                full_file_content = await f.read()
-                
-        total_lines = full_file_content.count('\n') + 1 if full_file_content else 0
         is_markdown = filename.lower().endswith('.md')
 
+        # The page fetches the content from ?mode=raw, so the file is neither
+        # read here nor re-encoded through the template
         self.render(
             "edit.html",
             filename=filename,
             path=path,
-            full_file_content=full_file_content,
-            total_lines=total_lines,
             features=get_current_feature_flags(),
             is_markdown=is_markdown,
         )
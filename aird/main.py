@@ -23,14 +23,16 @@ import sys
 import tempfile
 import threading
 import time
-from typing import Set
 from urllib.parse import unquote, urlparse
 import weakref
 
 import aiofiles
 from ldap3 import ALL, Connection, Server
 import tornado.escape as tornado_escape
+import tornado.httpserver
 import tornado.ioloop
+import tornado.netutil
+import tornado.process
 import tornado.web
 import tornado.websocket
 
@@ -77,7 +79,7 @@ from aird.handlers.auth_handlers import (
     LogoutHandler,
     ProfileHandler,
 )
-from aird.handlers.base_handler import BaseHandler
+from aird.handlers.base_handler import BaseHandler, FeatureFlagGZipContentEncoding
 from aird.handlers.file_op_handlers import (
     CloudUploadHandler,
     CopyHandler,
@@ -1160,6 +1162,11 @@ def make_app(settings, ldap_enabled=False, ldap_server=None, ldap_base_dn=None,
     # "Content-Length too long" before our handler can respond.
     settings.setdefault("max_body_size", constants.MAX_UPLOAD_FILE_SIZE_HARD_LIMIT)
     settings.setdefault("max_buffer_size", constants.MAX_UPLOAD_FILE_SIZE_HARD_LIMIT)
+    # Gzip text responses (listings, previews, JSON). Tornado leaves responses
+    # that already set Content-Encoding alone, so compressed downloads are safe.
+    # Passing our own transform replaces Tornado's compress_response one.
+    settings.setdefault("compress_response", True)
+    transforms = [FeatureFlagGZipContentEncoding] if settings["compress_response"] else []
     
     if ldap_enabled:
         settings["ldap_server"] = ldap_server
@@ -1196,7 +1203,7 @@ def make_app(settings, ldap_enabled=False, ldap_server=None, ldap_base_dn=None,
         (r"/admin/network-shares", AdminNetworkSharesHandler),
         (r"/admin/network-shares/delete", AdminNetworkShareDeleteHandler),
         (r"/admin/network-shares/toggle", AdminNetworkShareToggleHandler),
-        (r"/stream/(.*)", FileStreamHandler),
+        (r"/stream/(.+)", FileStreamHandler),
         (r"/features", FeatureFlagSocketHandler),
         (r"/upload", UploadHandler),
         (r"/mkdir", CreateFolderHandler),
@@ -1205,7 +1212,7 @@ def make_app(settings, ldap_enabled=False, ldap_server=None, ldap_base_dn=None,
         (r"/copy", CopyHandler),
         (r"/move", MoveHandler),
         (r"/api/bulk", BulkHandler),
-        (r"/edit/(.*)", EditViewHandler),
+        (r"/edit/(.+)", EditViewHandler),
         (r"/edit", EditHandler),
         (r"/api/files/(.*)", FileListAPIHandler),
         (r"/api/users/search", UserSearchAPIHandler),
@@ -1222,7 +1229,7 @@ def make_app(settings, ldap_enabled=False, ldap_server=None, ldap_base_dn=None,
         (r"/share/update", ShareUpdateHandler),
         (r"/shared/([A-Za-z0-9_\-]+)/verify", TokenVerificationHandler),
         (r"/shared/([A-Za-z0-9_\-]+)", SharedListHandler),
-        (r"/shared/([A-Za-z0-9_\-]+)/file/(.*)", SharedFileHandler),
+        (r"/shared/([A-Za-z0-9_\-]+)/file/(.+)", SharedFileHandler),
         (r"/search", SuperSearchHandler),
         (r"/search/ws", SuperSearchWebSocketHandler),
         (r"/p2p", P2PTransferHandler),
@@ -1240,7 +1247,7 @@ def make_app(settings, ldap_enabled=False, ldap_server=None, ldap_base_dn=None,
             (r"/admin/ldap/sync", LDAPSyncHandler),
         ])
     
-    return tornado.web.Application(routes, **settings)
+    return tornado.web.Application(routes, transforms=transforms, **settings)
 
 
 def print_banner():
@@ -1255,6 +1262,53 @@ def print_banner():
 """
     print(banner)
 
+def _bind_first_free_port(port: int, max_attempts: int = 100):
+    """Bind listening sockets on the first free port at or above port; return (sockets, port)."""
+    for candidate in range(port, port + max_attempts):
+        try:
+            return tornado.netutil.bind_sockets(candidate), candidate
+        except OSError:
+            continue
+    raise OSError(f"No free port found in range {port}-{port + max_attempts - 1}")
+
+def _fork_workers(workers: int) -> bool:
+    """Fork worker processes sharing the bound sockets; return True in the primary one.
+
+    workers=1 keeps a single process and 0 forks one per CPU. The parent only
+    supervises the children and never returns.
+    """
+    if workers == 1:
+        return True
+    tornado.process.fork_processes(workers)
+    return tornado.process.task_id() == 0
+
+# How often each worker re-reads admin settings when there are several
+SETTINGS_SYNC_INTERVAL = 1.0
+
+def _load_runtime_settings(conn: sqlite3.Connection) -> None:
+    """Copy persisted feature flags and upload settings into this process.
+
+    The admin page only updates the process that handled it, so other workers
+    call this periodically to pick up the change from the database.
+    """
+    for k, v in (_load_feature_flags(conn) or {}).items():
+        constants.FEATURE_FLAGS[k] = bool(v)
+    for k, v in (_load_upload_config(conn) or {}).items():
+        constants.UPLOAD_CONFIG[k] = int(v)
+    constants.MAX_FILE_SIZE = constants.UPLOAD_CONFIG["max_file_size_mb"] * 1024 * 1024
+    extensions = load_allowed_extensions(conn)
+    if extensions:
+        constants.UPLOAD_ALLOWED_EXTENSIONS = extensions
+
+def _install_uvloop() -> bool:
+    """Use uvloop's event loop when it is installed; Tornado runs on whatever asyncio provides."""
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
 def main():
     print_banner()
     
@@ -1262,6 +1316,10 @@ def main():
 
     logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
 
+    # Must happen before anything touches the IOLoop
+    if _install_uvloop():
+        logger.info("Using uvloop event loop")
+
     if config.LDAP_ENABLED:
         if not config.LDAP_SERVER:
             logger.error("LDAP is enabled, but --ldap-server is not configured.")
@@ -1310,6 +1368,26 @@ def main():
         "cloud_manager": constants.CLOUD_MANAGER,
     }
 
+    # Probe for a free port first, so the server is built and started only once
+    sockets, port = _bind_first_free_port(config.PORT)
+    scheme = "https" if config.SSL_CERT and config.SSL_KEY else "http"
+    logger.info(f"Serving {scheme.upper()} on 0.0.0.0 port {port} ({scheme}://0.0.0.0:{port}/) ...")
+    print(f"{scheme}://localhost:{port}/")
+    if config.HOSTNAME and config.HOSTNAME != 'localhost':
+        print(f"{scheme}://{config.HOSTNAME}:{port}/")
+    fqdn = socket.getfqdn()
+    if fqdn and fqdn != config.HOSTNAME and fqdn != 'localhost':
+        print(f"{scheme}://{fqdn}:{port}/")
+
+    # Nothing is uploading yet, so anything still staged is from a killed run
+    stale_uploads = clear_upload_staging_dir(constants.ROOT_DIR)
+    if stale_uploads:
+        logger.info(f"Removed {stale_uploads} unfinished upload(s) from a previous run")
+
+    # Fork before the database connection, background threads and IOLoop exist;
+    # every worker shares the sockets and cookie secret created above
+    primary = _fork_workers(config.WORKERS)
+
     # Initialize SQLite persistence under OS data dir
     try:
         data_dir = _get_data_dir()
@@ -1319,34 +1397,23 @@ def main():
         logger.info(f"Database already exists: {'Yes' if db_exists else 'No (will be created)'}")
         constants.DB_CONN = sqlite3.connect(constants.DB_PATH, check_same_thread=False)
         _init_db(constants.DB_CONN)
-        # Load persisted feature flags and merge
-        persisted_flags = _load_feature_flags(constants.DB_CONN)
-        if persisted_flags:
-            for k, v in persisted_flags.items():
-                constants.FEATURE_FLAGS[k] = bool(v)
-                logger.debug(f"Feature flag '{k}' set to {bool(v)} from database")
-        
+        # Load persisted feature flags and upload config and merge
+        _load_runtime_settings(constants.DB_CONN)
+
         # Log final feature flags status
         logger.info("Final feature flags:")
         for k, v in constants.FEATURE_FLAGS.items():
             logger.info(f"  {k}: {v}")
         
-        # Start LDAP sync scheduler
-        _start_ldap_sync_scheduler(constants.DB_CONN)
+        # Start LDAP sync scheduler (once, not in every worker)
+        if primary:
+            _start_ldap_sync_scheduler(constants.DB_CONN)
         # Database-only persistence for shares
         logger.info("Shares are now persisted directly in database")
         
-        # Load persisted upload config and merge
-        persisted_upload_config = _load_upload_config(constants.DB_CONN)
-        if persisted_upload_config:
-            for k, v in persisted_upload_config.items():
-                constants.UPLOAD_CONFIG[k] = int(v)
-                logger.debug(f"Upload config '{k}' set to {int(v)} from database")
-        constants.MAX_FILE_SIZE = constants.UPLOAD_CONFIG["max_file_size_mb"] * 1024 * 1024
         logger.info(f"Max upload file size: {constants.UPLOAD_CONFIG['max_file_size_mb']} MB")
-        # Load allowed upload extensions (when "allow all" is off)
-        constants.UPLOAD_ALLOWED_EXTENSIONS = load_allowed_extensions(constants.DB_CONN)
-        if not constants.UPLOAD_ALLOWED_EXTENSIONS:
+        # Seed allowed upload extensions (used when "allow all" is off)
+        if not load_allowed_extensions(constants.DB_CONN):
             constants.UPLOAD_ALLOWED_EXTENSIONS = set(constants.ALLOWED_UPLOAD_EXTENSIONS)
             save_allowed_extensions(constants.DB_CONN, constants.UPLOAD_ALLOWED_EXTENSIONS)
             logger.info("Seeded upload allowed extensions from defaults")
@@ -1354,10 +1421,11 @@ def main():
         # Assign admin privileges to configured admin users
         _assign_admin_privileges(constants.DB_CONN, config.ADMIN_USERS)
 
-        # Initialize network share manager and auto-start enabled shares
+        # Initialize network share manager and auto-start enabled shares; their
+        # ports can only be bound by one worker
         constants.NETWORK_SHARE_MANAGER = NetworkShareManager()
         try:
-            enabled_shares = [s for s in get_all_network_shares(constants.DB_CONN) if s.get("enabled")]
+            enabled_shares = [s for s in get_all_network_shares(constants.DB_CONN) if s.get("enabled")] if primary else []
             for share in enabled_shares:
                 constants.NETWORK_SHARE_MANAGER.start_share(share)
             if enabled_shares:
@@ -1393,54 +1461,40 @@ def main():
         ssl_context.load_cert_chain(config.SSL_CERT, config.SSL_KEY)
         ssl_options = ssl_context
     
-    port = config.PORT
-    while True:
-        try:
-            if ssl_options:
-                app.listen(
-                    port,
-                    ssl_options=ssl_options,
-                    max_body_size=constants.MAX_UPLOAD_FILE_SIZE_HARD_LIMIT,
-                    max_buffer_size=constants.MAX_UPLOAD_FILE_SIZE_HARD_LIMIT,
-                )
-                logger.info(f"Serving HTTPS on 0.0.0.0 port {port} (https://0.0.0.0:{port}/) ...")
-                print(f"https://localhost:{port}/")
-                if config.HOSTNAME and config.HOSTNAME != 'localhost':
-                    print(f"https://{config.HOSTNAME}:{port}/")
-                fqdn = socket.getfqdn()
-                if fqdn and fqdn != config.HOSTNAME and fqdn != 'localhost':
-                    print(f"https://{fqdn}:{port}/")
-            else:
-                app.listen(
-                    port,
-                    max_body_size=constants.MAX_UPLOAD_FILE_SIZE_HARD_LIMIT,
-                    max_buffer_size=constants.MAX_UPLOAD_FILE_SIZE_HARD_LIMIT,
-                )
-                logger.info(f"Serving HTTP on 0.0.0.0 port {port} (http://0.0.0.0:{port}/) ...")
-                print(f"http://localhost:{port}/")
-                if config.HOSTNAME and config.HOSTNAME != 'localhost':
-                    print(f"http://{config.HOSTNAME}:{port}/")
-                fqdn = socket.getfqdn()
-                if fqdn and fqdn != config.HOSTNAME and fqdn != 'localhost':
-                    print(f"http://{fqdn}:{port}/")
-
-            # Setup periodic cleanup of expired shares
-            def cleanup_expired_shares_periodic():
-                """Periodic task to cleanup expired shares"""
-                if constants.DB_CONN:
-                    deleted = _cleanup_expired_shares(constants.DB_CONN)
-                    if deleted > 0:
-                        logger.info(f"Cleaned up {deleted} expired share(s)")
-                # Schedule next cleanup in 1 hour (3600 seconds)
-                tornado.ioloop.IOLoop.current().call_later(3600, cleanup_expired_shares_periodic)
-            
-            # Start cleanup in 1 hour
-            tornado.ioloop.IOLoop.current().call_later(3600, cleanup_expired_shares_periodic)
-            
-            tornado.ioloop.IOLoop.current().start()
-            break
-        except OSError:
-            port += 1
+    server = tornado.httpserver.HTTPServer(
+        app,
+        ssl_options=ssl_options,
+        max_body_size=constants.MAX_UPLOAD_FILE_SIZE_HARD_LIMIT,
+        max_buffer_size=constants.MAX_UPLOAD_FILE_SIZE_HARD_LIMIT,
+    )
+    server.add_sockets(sockets)
+
+    # Setup periodic cleanup of expired shares
+    def cleanup_expired_shares_periodic():
+        """Periodic task to cleanup expired shares"""
+        if constants.DB_CONN:
+            deleted = _cleanup_expired_shares(constants.DB_CONN)
+            if deleted > 0:
+                logger.info(f"Cleaned up {deleted} expired share(s)")
+        # Schedule next cleanup in 1 hour (3600 seconds)
+        tornado.ioloop.IOLoop.current().call_later(3600, cleanup_expired_shares_periodic)
+    
+    # Start cleanup in 1 hour
+    tornado.ioloop.IOLoop.current().call_later(3600, cleanup_expired_shares_periodic)
+
+    # Admin changes land in one worker's memory; the others re-read the database
+    if config.WORKERS != 1:
+        def sync_runtime_settings_periodic():
+            if constants.DB_CONN:
+                try:
+                    _load_runtime_settings(constants.DB_CONN)
+                except Exception as e:
+                    logger.warning(f"Failed to reload settings from database: {e}")
+            tornado.ioloop.IOLoop.current().call_later(SETTINGS_SYNC_INTERVAL, sync_runtime_settings_periodic)
+
+        tornado.ioloop.IOLoop.current().call_later(SETTINGS_SYNC_INTERVAL, sync_runtime_settings_periodic)
+    
+    tornado.ioloop.IOLoop.current().start()
     
 if __name__ == "__main__":
     main()
@@ -1,4 +1,5 @@
 import os
+import asyncio
 import json
 import sqlite3
 from datetime import datetime
@@ -11,6 +12,9 @@ import tornado.ioloop
 import mmap
 import chardet
 
+import aird.config as config_module
+from aird.constants import UPLOAD_STAGING_FOLDER
+
 MMAP_MIN_SIZE = 1024 * 1024 # 1MB
 CHUNK_SIZE = 1024 * 1024 # 1MB
 
@@ -227,15 +231,39 @@ def get_file_icon(filename):
 def join_path(*parts):
     return os.path.join(*parts).replace("\\", "/")
 
+def _real_root(root: str) -> str:
+    # The served root is fixed for the life of the process, so config resolves
+    # it once. Share folders and upload dirs can be re-pointed, so those are
+    # resolved on every call.
+    if root == config_module.ROOT_DIR:
+        return config_module.REAL_ROOT_DIR
+    return os.path.realpath(root)
+
+def _inside(path_real: str, root_real: str) -> bool:
+    if path_real == root_real:
+        return True
+    # Plain prefix test; the trailing separator keeps "/data2" out of "/data"
+    return path_real.startswith(root_real.rstrip(os.sep) + os.sep)
+
 def is_within_root(path: str, root: str) -> bool:
     """Return True if path is within root after resolving symlinks and normalization."""
     try:
-        path_real = os.path.realpath(path)
-        root_real = os.path.realpath(root)
-        return os.path.commonpath([path_real, root_real]) == root_real
+        return _inside(os.path.realpath(path), _real_root(root))
     except Exception:
         return False
 
+def safe_resolve(root: str, *parts: str) -> str | None:
+    """Resolve parts under root in one pass; return the real path, or None if it escapes root."""
+    try:
+        candidate = os.path.realpath(os.path.join(root, *parts))
+        return candidate if _inside(candidate, _real_root(root)) else None
+    except Exception:
+        return None
+
+def nofollow_opener(path, flags):
+    """open() opener that refuses a symlink as the final path component."""
+    return os.open(path, flags | getattr(os, "O_NOFOLLOW", 0))
+
 def format_size(size: int) -> str:
     """Format size in bytes to human readable string"""
     for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -293,9 +321,9 @@ class WebSocketConnectionManager:
         self.connection_times = weakref.WeakKeyDictionary()
         self.last_activity = weakref.WeakKeyDictionary()
         self._cleanup_lock = threading.Lock()
-        
-        # Start periodic cleanup
-        self._setup_cleanup_timer()
+        # Managers are created at import time, before main() settles the event
+        # loop or forks workers, so the cleanup timer is armed by the first connection
+        self._cleanup_armed = False
     
     @property
     def max_connections(self) -> int:
@@ -327,6 +355,9 @@ class WebSocketConnectionManager:
         with self._cleanup_lock:
             if len(self.connections) >= self.max_connections:
                 return False
+            if not self._cleanup_armed:
+                self._cleanup_armed = True
+                self._setup_cleanup_timer()
             
             self.connections.add(connection)
             self.connection_times[connection] = time.time()
@@ -645,16 +676,21 @@ class FilterExpression:
 
 def get_files_in_directory(path="."):
     files = []
-    for entry in os.scandir(path):
-        stat = entry.stat()
-        files.append({
-            "name": entry.name,
-            "is_dir": entry.is_dir(),
-            "size_bytes": stat.st_size,
-            "size_str": f"{stat.st_size / 1024:.2f} KB" if not entry.is_dir() else "-",
-            "modified": datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-            "modified_timestamp": int(stat.st_mtime)
-        })
+    with os.scandir(path) as entries:
+        for entry in entries:
+            # is_dir() is answered from the directory read itself; only stat() hits the disk
+            is_dir = entry.is_dir()
+            if is_dir and entry.name == UPLOAD_STAGING_FOLDER:
+                continue
+            stat = entry.stat()
+            files.append({
+                "name": entry.name,
+                "is_dir": is_dir,
+                "size_bytes": stat.st_size,
+                "size_str": f"{stat.st_size / 1024:.2f} KB" if not is_dir else "-",
+                "modified": datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+                "modified_timestamp": int(stat.st_mtime)
+            })
     return files
 
 def is_video_file(filename):
@@ -673,17 +709,18 @@ def get_all_files_recursive(root_path: str, base_path: str = "") -> list:
     """Recursively get all files in a directory"""
     all_files = []
     try:
-        for item in os.listdir(root_path):
-            item_path = os.path.join(root_path, item)
-            relative_path = os.path.join(base_path, item) if base_path else item
-            
-            if os.path.isfile(item_path):
-                # It's a file, add it to the list
-                all_files.append(relative_path)
-            elif os.path.isdir(item_path):
-                # It's a directory, recursively scan it
-                sub_files = get_all_files_recursive(item_path, relative_path)
-                all_files.extend(sub_files)
+        # scandir's DirEntry answers is_file()/is_dir() without a stat() per item
+        with os.scandir(root_path) as entries:
+            for entry in entries:
+                relative_path = os.path.join(base_path, entry.name) if base_path else entry.name
+
+                if entry.is_file():
+                    # It's a file, add it to the list
+                    all_files.append(relative_path)
+                elif entry.is_dir() and entry.name != UPLOAD_STAGING_FOLDER:
+                    # It's a directory, recursively scan it
+                    sub_files = get_all_files_recursive(entry.path, relative_path)
+                    all_files.extend(sub_files)
     except (OSError, PermissionError) as e:
         print(f"Error scanning directory {root_path}: {e}")
     
@@ -752,6 +789,34 @@ def is_cloud_relative_path(share_id: str, relative_path: str) -> bool:
     return normalized.startswith(prefix)
 
 
+def is_upload_staging_path(path: str, root: str) -> bool:
+    """Return True if path is root's upload staging folder or inside it."""
+    path = os.path.abspath(path)
+    # Callers pass either a joined or an already resolved path
+    for base in {os.path.abspath(root), _real_root(root)}:
+        if _inside(path, os.path.join(base, UPLOAD_STAGING_FOLDER)):
+            return True
+    return False
+
+
+def clear_upload_staging_dir(root: str) -> int:
+    """Remove uploads left half-written by a previous run; return how many."""
+    staging_dir = os.path.join(root, UPLOAD_STAGING_FOLDER)
+    removed = 0
+    try:
+        with os.scandir(staging_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith("aird_upload_") and entry.is_file(follow_symlinks=False):
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except OSError:
+                        pass
+    except OSError:
+        pass
+    return removed
+
+
 def remove_cloud_file_if_exists(share_id: str, relative_path: str) -> None:
     from aird.constants import ROOT_DIR
     if not is_cloud_relative_path(share_id, relative_path):
@@ -875,6 +940,8 @@ def get_current_feature_flags() -> dict:
     """Return current feature flags with in-memory changes taking precedence over DB.
     This ensures real-time updates are immediately reflected.
     Falls back to in-memory defaults if DB is unavailable.
+    With several workers the DB wins instead, since an admin change only
+    reaches the memory of the worker that handled it.
     """
     from aird.constants import FEATURE_FLAGS
     import aird.constants as constants_module
@@ -892,7 +959,8 @@ def get_current_feature_flags() -> dict:
                 merged = persisted.copy()
                 # Then overlay in-memory changes (in-memory takes precedence for real-time updates)
                 for k, v in current.items():
-                    merged[k] = bool(v)
+                    if config_module.WORKERS == 1 or k not in persisted:
+                        merged[k] = bool(v)
                 # Also include any DB-only flags
                 for k, v in persisted.items():
                     if k not in merged:
@@ -935,18 +1003,19 @@ class MMapFileHandler:
         return file_size >= MMAP_MIN_SIZE
     
     @staticmethod
-    async def serve_file_chunk(file_path: str, start: int = 0, end: int = None, chunk_size: int = CHUNK_SIZE):
+    async def serve_file_chunk(file_path: str, start: int = 0, end: int = None, chunk_size: int = CHUNK_SIZE, opener=None):
         """Serve file chunks using mmap for efficient memory usage"""
         try:
             file_size = os.path.getsize(file_path)
             
             if not MMapFileHandler.should_use_mmap(file_size):
                 # Use traditional method for small files
-                with open(file_path, 'rb') as f:
+                with open(file_path, 'rb', opener=opener) as f:
                     f.seek(start)
                     remaining = (end - start + 1) if end is not None else file_size - start
                     while remaining > 0:
-                        chunk = f.read(min(chunk_size, remaining))
+                        # Read in a worker thread so a slow disk doesn't stall the IOLoop
+                        chunk = await asyncio.to_thread(f.read, min(chunk_size, remaining))
                         if not chunk:
                             break
                         yield chunk
@@ -954,23 +1023,24 @@ class MMapFileHandler:
                 return
             
             # Use mmap for large files
-            with open(file_path, 'rb') as f:
+            with open(file_path, 'rb', opener=opener) as f:
                 with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
                     actual_end = min(end or file_size - 1, file_size - 1)
                     current = start
                     
                     while current <= actual_end:
                         chunk_end = min(current + chunk_size, actual_end + 1)
-                        yield mm[current:chunk_end]
+                        # Slicing may fault pages in from disk; keep that off the IOLoop
+                        yield await asyncio.to_thread(mm.__getitem__, slice(current, chunk_end))
                         current = chunk_end
                         
         except (OSError, ValueError) as e:
             # Fallback to traditional method on mmap errors
-            with open(file_path, 'rb') as f:
+            with open(file_path, 'rb', opener=opener) as f:
                 f.seek(start)
                 remaining = (end - start + 1) if end is not None else file_size - start
                 while remaining > 0:
-                    chunk = f.read(min(chunk_size, remaining))
+                    chunk = await asyncio.to_thread(f.read, min(chunk_size, remaining))
                     if not chunk:
                         break
                     yield chunk
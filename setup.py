@@ -39,6 +39,9 @@ setup(
         'cheroot>=10.0.0',
     ] + rust_dependencies,
     extras_require={
+        'uvloop': [
+            'uvloop>=0.19.0; sys_platform != "win32"',
+        ],
         'test': [
             'pytest>=8.3.3',
             'pytest-asyncio>=0.25.0',
@@ -1,3 +1,5 @@
+import asyncio
+import io
 import json
 import os
 
@@ -15,6 +17,7 @@ from aird.handlers.api_handlers import (
     SuperSearchWebSocketHandler,
     UserSearchAPIHandler,
     WebSocketStatsHandler,
+    _tail_n,
 )
 from tests.handler_helpers import authenticate, patch_db_conn, prepare_handler
 
@@ -319,6 +322,15 @@ class TestFileStreamHandler:
         await handler.open("log.txt")
         handler.close.assert_called_with(code=1008, reason="Authentication required")
 
+    def test_get_current_user_uses_token_auth(self):
+        handler = make_ws_handler(FileStreamHandler)
+        handler.request.headers = {'Authorization': 'Bearer secret'}
+        handler.get_secure_cookie = MagicMock(return_value=None)
+        with patch('aird.handlers.base_handler.config_module.ACCESS_TOKEN', 'secret'):
+            assert handler.get_current_user() == {"username": "token_user", "role": "admin"}
+            handler.get_current_user()
+        handler.get_secure_cookie.assert_called_once_with("user")
+
     @pytest.mark.asyncio
     async def test_open_connection_limit(self):
         handler = make_ws_handler(FileStreamHandler)
@@ -342,6 +354,113 @@ class TestFileStreamHandler:
         handler.write_message.assert_called_with(json.dumps({'type': 'error', 'message': 'Invalid request: action is required'}))
 
 
+    @pytest.mark.asyncio
+    async def test_open_reuses_one_handle_for_tail_and_stream(self, tmp_path):
+        path = tmp_path / "app.log"
+        path.write_text("old 1\nold 2\n")
+        handler = make_ws_handler(FileStreamHandler)
+        handler.get_current_user = MagicMock(return_value={'username': 'user'})
+        handler.set_nodelay = MagicMock()
+        handler.stream_file = AsyncMock()
+        with patch('aird.handlers.api_handlers.ROOT_DIR', str(tmp_path)), \
+             patch.object(FileStreamHandler.connection_manager, 'add_connection', return_value=True), \
+             patch('aird.handlers.api_handlers.FileWatcher.create', return_value=None):
+            await handler.open("app.log")
+        try:
+            handler.write_message.assert_called_with(json.dumps({'type': 'lines', 'data': ['old 1', 'old 2']}))
+            # Left at EOF, so only lines written after open() are streamed
+            with open(path, "a") as f:
+                f.write("new\n")
+            assert handler._read_available_lines() == ["new\n"]
+        finally:
+            handler.file.close()
+
+    @pytest.mark.asyncio
+    async def test_open_rejects_symlink_out_of_root(self, tmp_path):
+        outside = tmp_path / "outside.log"
+        outside.write_text("secret\n")
+        root = tmp_path / "root"
+        root.mkdir()
+        os.symlink(outside, root / "link.log")
+        handler = make_ws_handler(FileStreamHandler)
+        handler.get_current_user = MagicMock(return_value={'username': 'user'})
+        with patch('aird.handlers.api_handlers.ROOT_DIR', str(root)), \
+             patch.object(FileStreamHandler.connection_manager, 'add_connection', return_value=True):
+            await handler.open("link.log")
+        handler.close.assert_called_with(code=1003, reason="File not found")
+        assert handler.file is None
+
+    def test_read_available_lines_is_bounded(self):
+        handler = make_ws_handler(FileStreamHandler)
+        handler.file = io.StringIO("".join(f"line {i}\n" for i in range(300)))
+        batch = handler._read_available_lines()
+        assert len(batch) == FileStreamHandler.STREAM_BATCH_MAX_LINES
+        assert batch[0] == "line 0\n"
+        # The remainder is picked up by the next batch
+        assert len(handler._read_available_lines()) == 300 - FileStreamHandler.STREAM_BATCH_MAX_LINES
+        assert handler._read_available_lines() == []
+
+    def test_filter_lines(self):
+        handler = make_ws_handler(FileStreamHandler)
+        lines = ["ERROR disk full\n", "INFO started\n"]
+        assert handler._filter_lines(lines) == lines
+        handler.filter_expression = "ERROR"
+        assert handler._filter_lines(lines) == ["ERROR disk full\n"]
+
+    @pytest.mark.asyncio
+    async def test_start_reuses_running_stream_task(self):
+        handler = make_ws_handler(FileStreamHandler)
+        handler.get_current_user = MagicMock(return_value={'username': 'user'})
+        release = asyncio.Event()
+        handler.stream_file = MagicMock(side_effect=lambda: release.wait())
+        await handler.on_message(json.dumps({'action': 'start'}))
+        task = handler._stream_task
+        await handler.on_message(json.dumps({'action': 'stop'}))
+        await handler.on_message(json.dumps({'action': 'start'}))
+        assert handler._stream_task is task
+        assert handler.stream_file.call_count == 1
+        assert not handler.stop_event.is_set()
+        handler.on_close()
+        await asyncio.sleep(0)
+        assert task.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_poll_delay_backs_off_when_idle(self):
+        handler = make_ws_handler(FileStreamHandler)
+        with patch('aird.handlers.api_handlers.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+            for _ in range(8):
+                await handler._wait_for_change()
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        assert delays[0] == FileStreamHandler.STREAM_POLL_MIN_DELAY
+        assert delays == sorted(delays)
+        assert delays[-1] == FileStreamHandler.STREAM_POLL_MAX_DELAY
+
+    def test_on_close_releases_watcher(self):
+        handler = make_ws_handler(FileStreamHandler)
+        watcher = MagicMock()
+        handler.watcher = watcher
+        handler.on_close()
+        watcher.close.assert_called_once()
+        assert handler.watcher is None
+        assert handler.is_streaming is False
+
+
+class TestTailN:
+    def test_returns_last_lines_across_blocks(self):
+        data = "".join(f"line {i}\n" for i in range(1000)).encode()
+        # A tiny block size forces many backward reads
+        assert _tail_n(io.BytesIO(data), n=3, block=7) == ["line 997\n", "line 998\n", "line 999\n"]
+
+    def test_short_file_and_missing_trailing_newline(self):
+        assert _tail_n(io.BytesIO(b"first\nsecond"), n=10) == ["first\n", "second"]
+
+    def test_empty_file(self):
+        assert _tail_n(io.BytesIO(b"")) == []
+
+    def test_invalid_utf8_is_replaced(self):
+        assert _tail_n(io.BytesIO(b"ok\n\xff\xfe\n"), n=1) == ["\ufffd\ufffd\n"]
+
+
 class TestWebSocketStatsHandler:
     def test_requires_admin(self):
         handler = make_request_handler(WebSocketStatsHandler)
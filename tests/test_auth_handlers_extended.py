@@ -177,6 +177,17 @@ class TestLoginHandlerExtended:
             assert not any("Token length mismatch" in arg for arg in args)
             assert any("Token authentication failed" in arg for arg in args)
 
+    def test_post_token_non_ascii(self):
+        """A non-ASCII token is rejected like any other mismatch, not a 500"""
+        handler = LoginHandler(self.mock_app, self.mock_request)
+        handler.get_argument = MagicMock(side_effect=lambda k, d=None: "caf\u00e9" if k == "token" else "")
+
+        with patch('aird.config.ACCESS_TOKEN', 'correct_token'), \
+             patch.object(handler, 'render') as mock_render:
+
+            handler.post()
+            mock_render.assert_called_with("login.html", error="Invalid credentials. Try again.", settings=ANY, next_url=ANY)
+
     def test_post_token_success(self):
         handler = LoginHandler(self.mock_app, self.mock_request)
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: "valid_token" if k == "token" else "")
@@ -231,6 +242,16 @@ class TestAdminLoginHandlerExtended:
             mock_redirect.assert_called_with("/admin")
             mock_cookie.assert_called_with("admin", "authenticated", httponly=True, secure=ANY, samesite="Strict", expires_days=1)
 
+    def test_post_admin_token_non_ascii(self):
+        handler = AdminLoginHandler(self.mock_app, self.mock_request)
+        handler.get_argument = MagicMock(side_effect=lambda k, d=None: "\u00fcber" if k == "token" else "")
+
+        with patch('aird.config.ADMIN_TOKEN', 'admin_token'), \
+             patch.object(handler, 'redirect') as mock_redirect, \
+             patch.object(handler, 'render'):
+            handler.post()
+            mock_redirect.assert_not_called()
+
     def test_post_admin_token_fail(self):
         handler = AdminLoginHandler(self.mock_app, self.mock_request)
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: "wrong" if k == "token" else "")
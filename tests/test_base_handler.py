@@ -1,7 +1,9 @@
 
 import pytest
 from unittest.mock import patch, MagicMock
-from aird.handlers.base_handler import BaseHandler
+from aird.handlers.base_handler import BaseHandler, FeatureFlagGZipContentEncoding
+from tornado.httputil import HTTPHeaders
+import gzip
 import json
 
 from tests.handler_helpers import authenticate, patch_db_conn, prepare_handler
@@ -37,6 +39,22 @@ class TestBaseHandler:
             assert user['username'] == 'token_user'
             assert user['role'] == 'admin'
 
+    def test_get_current_user_cached_per_request(self):
+        handler = prepare_handler(BaseHandler(self.mock_app, self.mock_request))
+        user_data = {'username': 'testuser', 'role': 'user'}
+
+        db_conn = MagicMock()
+        with patch.object(handler, 'get_secure_cookie', return_value=json.dumps(user_data).encode('utf-8')) as mock_cookie, \
+             patch_db_conn(db_conn, modules=['aird.handlers.base_handler']), \
+             patch('aird.db.get_user_by_username', return_value=user_data) as mock_lookup:
+
+            assert handler.get_current_user() == user_data
+            assert handler.get_display_username() == 'testuser (User)'
+            assert handler.get_current_user() == user_data
+            # Cookie verification and DB lookup happen once per request
+            mock_cookie.assert_called_once_with("user")
+            mock_lookup.assert_called_once()
+
     def test_is_admin_user_true(self):
         handler = prepare_handler(BaseHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='admin')
@@ -101,3 +119,28 @@ class TestBaseHandler:
         assert f"'nonce-{nonce}'" in csp_value
         assert "'unsafe-inline'" not in csp_value.split('script-src')[1].split(';')[0]
 
+
+class TestFeatureFlagGZipContentEncoding:
+    def _transform(self):
+        request = MagicMock()
+        request.headers = {"Accept-Encoding": "gzip"}
+        return FeatureFlagGZipContentEncoding(request)
+
+    def test_compresses_when_flag_on(self):
+        transform = self._transform()
+        body = b"x" * 4096
+        with patch('aird.handlers.base_handler.is_feature_enabled', return_value=True):
+            _, headers, chunk = transform.transform_first_chunk(
+                200, HTTPHeaders({"Content-Type": "text/html"}), body, True)
+        assert headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(chunk) == body
+
+    def test_passes_through_when_flag_off(self):
+        transform = self._transform()
+        body = b"x" * 4096
+        with patch('aird.handlers.base_handler.is_feature_enabled', return_value=False):
+            _, headers, chunk = transform.transform_first_chunk(
+                200, HTTPHeaders({"Content-Type": "text/html"}), body, False)
+        assert "Content-Encoding" not in headers
+        assert chunk == body
+        assert transform.transform_chunk(b"more", True) == b"more"
@@ -169,6 +169,7 @@ class TestInitConfig:
             config_data = {
                 'root': '/test/root',
                 'port': 9000,
+                'workers': 4,
                 'token': 'test_token',
                 'admin_token': 'admin_test_token',
                 'features': {
@@ -193,6 +194,7 @@ class TestInitConfig:
                 assert config.CONFIG_FILE == config_file
                 assert config.ROOT_DIR == '/test/root'
                 assert config.PORT == 9000
+                assert config.WORKERS == 4
                 assert config.ACCESS_TOKEN == 'test_token'
                 assert config.ADMIN_TOKEN == 'admin_test_token'
                 assert config.FEATURE_FLAGS.get('feature1') is True
@@ -202,7 +204,7 @@ class TestInitConfig:
     
     def test_init_config_command_line_args(self):
         """Test init_config with command line arguments"""
-        with patch('sys.argv', ['test', '--root', '/cli/root', '--port', '8080', '--token', 'cli_token']):
+        with patch('sys.argv', ['test', '--root', '/cli/root', '--port', '8080', '--workers', '0', '--token', 'cli_token']):
             from aird import config
             # Reset module state
             config.CONFIG_FILE = None
@@ -212,7 +214,9 @@ class TestInitConfig:
             config.init_config()
             
             assert config.ROOT_DIR == '/cli/root'
+            assert config.REAL_ROOT_DIR == os.path.realpath('/cli/root')
             assert config.PORT == 8080
+            assert config.WORKERS == 0
             assert config.ACCESS_TOKEN == 'cli_token'
     
     def test_init_config_ldap_settings(self):
@@ -44,8 +44,7 @@ class TestUploadHandler:
         self._setup_handler_for_post(handler)
         
         with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.realpath', side_effect=lambda p: p), \
-             patch('aird.handlers.file_op_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.file_op_handlers.safe_resolve', side_effect=os.path.join), \
              patch('aird.handlers.file_op_handlers.ALLOWED_UPLOAD_EXTENSIONS', {'.txt'}), \
              patch('shutil.move') as mock_move, \
              patch('os.makedirs'), \
@@ -55,6 +54,32 @@ class TestUploadHandler:
             mock_move.assert_called()
             assert mock_write.call_args[0][0] == "Upload successful"
 
+    def test_temp_file_staged_in_hidden_folder(self, tmp_path):
+        handler = UploadHandler(self.mock_app, self.mock_request)
+        (tmp_path / 'uploads').mkdir()
+        handler.upload_dir = 'uploads'
+
+        with patch('aird.handlers.file_op_handlers.ROOT_DIR', str(tmp_path)):
+            fd, temp_path = handler._create_temp_file()
+        os.close(fd)
+
+        # Same filesystem as the destination, but never in the user's folder
+        assert os.path.dirname(temp_path) == os.path.realpath(str(tmp_path / '.aird_tmp'))
+        assert os.listdir(tmp_path / 'uploads') == []
+        os.remove(temp_path)
+
+    def test_temp_file_falls_back_when_root_not_writable(self, tmp_path):
+        handler = UploadHandler(self.mock_app, self.mock_request)
+        handler.upload_dir = 'uploads'
+
+        with patch('aird.handlers.file_op_handlers.ROOT_DIR', str(tmp_path)), \
+             patch('os.makedirs', side_effect=PermissionError("read-only")):
+            fd, temp_path = handler._create_temp_file()
+        os.close(fd)
+
+        assert not temp_path.startswith(str(tmp_path))
+        os.remove(temp_path)
+
     @pytest.mark.asyncio
     async def test_upload_feature_disabled(self):
         handler = prepare_handler(UploadHandler(self.mock_app, self.mock_request))
@@ -113,8 +138,7 @@ class TestUploadHandler:
         self._setup_handler_for_post(handler, upload_dir='../../../etc')
         
         with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.realpath', side_effect=lambda p: p), \
-             patch('aird.handlers.file_op_handlers.is_within_root', return_value=False), \
+             patch('aird.handlers.file_op_handlers.safe_resolve', return_value=None), \
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
@@ -129,8 +153,7 @@ class TestUploadHandler:
         self._setup_handler_for_post(handler, filename='.')
         
         with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.realpath', side_effect=lambda p: p), \
-             patch('aird.handlers.file_op_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.file_op_handlers.safe_resolve', side_effect=os.path.join), \
              patch('os.path.basename', return_value='.'), \
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
@@ -146,8 +169,7 @@ class TestUploadHandler:
         self._setup_handler_for_post(handler, filename='..')
         
         with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.realpath', side_effect=lambda p: p), \
-             patch('aird.handlers.file_op_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.file_op_handlers.safe_resolve', side_effect=os.path.join), \
              patch('os.path.basename', return_value='..'), \
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
@@ -163,8 +185,7 @@ class TestUploadHandler:
         self._setup_handler_for_post(handler, filename='malware.exe')
         
         with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.realpath', side_effect=lambda p: p), \
-             patch('aird.handlers.file_op_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.file_op_handlers.safe_resolve', side_effect=os.path.join), \
              patch('aird.handlers.file_op_handlers.ALLOWED_UPLOAD_EXTENSIONS', {'.txt', '.pdf'}), \
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
@@ -181,8 +202,7 @@ class TestUploadHandler:
         self._setup_handler_for_post(handler, filename=long_filename)
         
         with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.realpath', side_effect=lambda p: p), \
-             patch('aird.handlers.file_op_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.file_op_handlers.safe_resolve', side_effect=os.path.join), \
              patch('aird.handlers.file_op_handlers.ALLOWED_UPLOAD_EXTENSIONS', {'.txt'}), \
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
@@ -198,11 +218,10 @@ class TestUploadHandler:
         self._setup_handler_for_post(handler)
         
         # First check passes, second fails (final path validation)
-        is_within_root_calls = [True, False]
+        safe_resolve_calls = ['/tmp/uploads', None]
         
         with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.realpath', side_effect=lambda p: p), \
-             patch('aird.handlers.file_op_handlers.is_within_root', side_effect=is_within_root_calls), \
+             patch('aird.handlers.file_op_handlers.safe_resolve', side_effect=safe_resolve_calls), \
              patch('aird.handlers.file_op_handlers.ALLOWED_UPLOAD_EXTENSIONS', {'.txt'}), \
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
@@ -218,8 +237,7 @@ class TestUploadHandler:
         self._setup_handler_for_post(handler)
         
         with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.realpath', side_effect=lambda p: p), \
-             patch('aird.handlers.file_op_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.file_op_handlers.safe_resolve', side_effect=os.path.join), \
              patch('aird.handlers.file_op_handlers.ALLOWED_UPLOAD_EXTENSIONS', {'.txt'}), \
              patch('shutil.move', side_effect=OSError("Permission denied")), \
              patch('os.makedirs'), \
@@ -243,8 +261,7 @@ class TestUploadHandler:
         handler._writer_task = asyncio.create_task(dummy_task())
         
         with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.realpath', side_effect=lambda p: p), \
-             patch('aird.handlers.file_op_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.file_op_handlers.safe_resolve', side_effect=os.path.join), \
              patch('aird.handlers.file_op_handlers.ALLOWED_UPLOAD_EXTENSIONS', {'.txt'}), \
              patch('shutil.move'), \
              patch('os.makedirs'), \
@@ -324,6 +341,42 @@ class TestUploadHandler:
         # Should not raise
         handler.on_finish()
 
+    @pytest.mark.asyncio
+    async def test_prepare_rejects_anonymous_before_staging(self):
+        handler = prepare_handler(UploadHandler(self.mock_app, self.mock_request))
+        handler.get_current_user = MagicMock(return_value=None)
+
+        with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
+             patch.object(handler, '_create_temp_file') as mock_create:
+            await handler.prepare()
+
+        assert handler._reject
+        assert handler._temp_path is None
+        mock_create.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_connection_close_discards_staged_file(self, tmp_path):
+        handler = prepare_handler(UploadHandler(self.mock_app, self.mock_request))
+        authenticate(handler, role='user')
+        (tmp_path / 'uploads').mkdir()
+
+        with patch('aird.handlers.file_op_handlers.is_feature_enabled', return_value=True), \
+             patch('aird.handlers.file_op_handlers.ROOT_DIR', str(tmp_path)):
+            await handler.prepare()
+        handler.data_received(b'partial body')
+        temp_path = handler._temp_path
+        assert os.path.exists(temp_path)
+
+        # Client aborts mid-body: Tornado calls on_connection_close, not on_finish
+        handler.on_connection_close()
+        for _ in range(50):
+            if not os.path.exists(temp_path):
+                break
+            await asyncio.sleep(0.02)
+
+        assert not os.path.exists(temp_path)
+        assert os.listdir(tmp_path / 'uploads') == []
+
 class TestUploadHandlerDynamicMaxSize:
     """Tests for dynamic max file size enforcement in UploadHandler"""
 
@@ -464,7 +517,8 @@ class TestDeleteHandler:
         self.mock_request = MagicMock()
         self.mock_app.settings = {'cookie_secret': 'test_secret'}
 
-    def test_delete_file(self):
+    @pytest.mark.asyncio
+    async def test_delete_file(self):
         handler = prepare_handler(DeleteHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(return_value="test.txt")
@@ -476,11 +530,12 @@ class TestDeleteHandler:
              patch('os.remove') as mock_remove, \
              patch.object(handler, 'redirect') as mock_redirect:
             
-            handler.post()
+            await handler.post()
             mock_remove.assert_called_with('/root/test.txt')
             mock_redirect.assert_called()
 
-    def test_delete_feature_disabled(self):
+    @pytest.mark.asyncio
+    async def test_delete_feature_disabled(self):
         handler = prepare_handler(DeleteHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         
@@ -488,11 +543,12 @@ class TestDeleteHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(403)
             assert "disabled" in mock_write.call_args[0][0].lower()
 
-    def test_delete_access_denied(self):
+    @pytest.mark.asyncio
+    async def test_delete_access_denied(self):
         handler = prepare_handler(DeleteHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(return_value="../../../etc/passwd")
@@ -503,11 +559,12 @@ class TestDeleteHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(403)
             assert "denied" in mock_write.call_args[0][0].lower()
 
-    def test_delete_directory(self):
+    @pytest.mark.asyncio
+    async def test_delete_directory(self):
         handler = prepare_handler(DeleteHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(return_value="subdir")
@@ -517,14 +574,16 @@ class TestDeleteHandler:
              patch('aird.handlers.file_op_handlers.is_within_root', return_value=True), \
              patch('os.path.isdir', return_value=True), \
              patch('os.path.isfile', return_value=False), \
+             patch('os.listdir', return_value=[]), \
              patch('shutil.rmtree') as mock_rmtree, \
              patch.object(handler, 'redirect') as mock_redirect:
             
-            handler.post()
+            await handler.post()
             mock_rmtree.assert_called_with('/root/subdir')
             mock_redirect.assert_called()
 
-    def test_delete_with_parent_path(self):
+    @pytest.mark.asyncio
+    async def test_delete_with_parent_path(self):
         handler = prepare_handler(DeleteHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(return_value="subdir/file.txt")
@@ -536,7 +595,7 @@ class TestDeleteHandler:
              patch('os.remove'), \
              patch.object(handler, 'redirect') as mock_redirect:
             
-            handler.post()
+            await handler.post()
             # Should redirect to parent directory
             mock_redirect.assert_called_with('/files/subdir')
 
@@ -546,7 +605,8 @@ class TestRenameHandler:
         self.mock_request = MagicMock()
         self.mock_app.settings = {'cookie_secret': 'test_secret'}
 
-    def test_rename_file(self):
+    @pytest.mark.asyncio
+    async def test_rename_file(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: {'path': 'old.txt', 'new_name': 'new.txt'}.get(k, d))
@@ -558,11 +618,12 @@ class TestRenameHandler:
              patch('os.rename') as mock_rename, \
              patch.object(handler, 'redirect') as mock_redirect:
             
-            handler.post()
+            await handler.post()
             mock_rename.assert_called()
             mock_redirect.assert_called()
 
-    def test_rename_feature_disabled(self):
+    @pytest.mark.asyncio
+    async def test_rename_feature_disabled(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         
@@ -570,11 +631,12 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(403)
             assert "disabled" in mock_write.call_args[0][0].lower()
 
-    def test_rename_empty_path(self):
+    @pytest.mark.asyncio
+    async def test_rename_empty_path(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: {'path': '', 'new_name': 'new.txt'}.get(k, d))
@@ -583,11 +645,12 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(400)
             assert "required" in mock_write.call_args[0][0].lower()
 
-    def test_rename_empty_new_name(self):
+    @pytest.mark.asyncio
+    async def test_rename_empty_new_name(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: {'path': 'old.txt', 'new_name': ''}.get(k, d))
@@ -596,11 +659,12 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(400)
             assert "required" in mock_write.call_args[0][0].lower()
 
-    def test_rename_invalid_filename_dot(self):
+    @pytest.mark.asyncio
+    async def test_rename_invalid_filename_dot(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: {'path': 'old.txt', 'new_name': '.'}.get(k, d))
@@ -609,11 +673,12 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(400)
             assert "invalid filename" in mock_write.call_args[0][0].lower()
 
-    def test_rename_invalid_filename_dotdot(self):
+    @pytest.mark.asyncio
+    async def test_rename_invalid_filename_dotdot(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: {'path': 'old.txt', 'new_name': '..'}.get(k, d))
@@ -622,11 +687,12 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(400)
             assert "invalid filename" in mock_write.call_args[0][0].lower()
 
-    def test_rename_invalid_filename_with_slash(self):
+    @pytest.mark.asyncio
+    async def test_rename_invalid_filename_with_slash(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: {'path': 'old.txt', 'new_name': 'path/name'}.get(k, d))
@@ -635,11 +701,12 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(400)
             assert "invalid filename" in mock_write.call_args[0][0].lower()
 
-    def test_rename_invalid_filename_with_backslash(self):
+    @pytest.mark.asyncio
+    async def test_rename_invalid_filename_with_backslash(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: {'path': 'old.txt', 'new_name': 'path\\name'}.get(k, d))
@@ -648,11 +715,12 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(400)
             assert "invalid filename" in mock_write.call_args[0][0].lower()
 
-    def test_rename_filename_too_long(self):
+    @pytest.mark.asyncio
+    async def test_rename_filename_too_long(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         long_name = 'a' * 260
@@ -662,11 +730,12 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(400)
             assert "too long" in mock_write.call_args[0][0].lower()
 
-    def test_rename_access_denied(self):
+    @pytest.mark.asyncio
+    async def test_rename_access_denied(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: {'path': '../etc/passwd', 'new_name': 'new.txt'}.get(k, d))
@@ -677,11 +746,12 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(403)
             assert "denied" in mock_write.call_args[0][0].lower()
 
-    def test_rename_file_not_found(self):
+    @pytest.mark.asyncio
+    async def test_rename_file_not_found(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: {'path': 'nonexistent.txt', 'new_name': 'new.txt'}.get(k, d))
@@ -693,11 +763,12 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(404)
             assert "not found" in mock_write.call_args[0][0].lower()
 
-    def test_rename_os_error(self):
+    @pytest.mark.asyncio
+    async def test_rename_os_error(self):
         handler = prepare_handler(RenameHandler(self.mock_app, self.mock_request))
         authenticate(handler, role='user')
         handler.get_argument = MagicMock(side_effect=lambda k, d=None: {'path': 'old.txt', 'new_name': 'new.txt'}.get(k, d))
@@ -710,7 +781,7 @@ class TestRenameHandler:
              patch.object(handler, 'set_status') as mock_set_status, \
              patch.object(handler, 'write') as mock_write:
             
-            handler.post()
+            await handler.post()
             mock_set_status.assert_called_with(500)
             assert "failed" in mock_write.call_args[0][0].lower()
 
@@ -0,0 +1,82 @@
+"""Tests for aird/core/file_watcher.py"""
+
+import asyncio
+
+import pytest
+from unittest.mock import patch
+
+from aird.core import file_watcher
+from aird.core.file_watcher import FileWatcher
+
+
+class TestLoadInotify:
+    def test_non_linux_platform_falls_back(self):
+        with patch.object(file_watcher.sys, "platform", "win32"), \
+             patch.object(file_watcher.ctypes, "CDLL") as mock_cdll:
+            assert file_watcher._load_inotify() is None
+        mock_cdll.assert_not_called()
+
+    def test_missing_libc_falls_back(self):
+        # find_library returns None when there is no C library to find, and
+        # CDLL(None) raises TypeError on Windows
+        with patch.object(file_watcher.sys, "platform", "linux"), \
+             patch.object(file_watcher.ctypes.util, "find_library", return_value=None), \
+             patch.object(file_watcher.ctypes, "CDLL", side_effect=TypeError("argument of type 'NoneType' is not iterable")):
+            assert file_watcher._load_inotify() is None
+
+
+requires_inotify = pytest.mark.skipif(
+    not file_watcher.INOTIFY_AVAILABLE, reason="inotify not available on this platform"
+)
+
+
+class TestFileWatcherCreate:
+    def test_returns_none_without_inotify(self, tmp_path):
+        path = tmp_path / "log.txt"
+        path.write_text("")
+        with patch.object(file_watcher, "INOTIFY_AVAILABLE", False):
+            assert FileWatcher.create(str(path)) is None
+
+    @requires_inotify
+    @pytest.mark.asyncio
+    async def test_returns_none_for_missing_file(self, tmp_path):
+        assert FileWatcher.create(str(tmp_path / "missing.txt")) is None
+
+
+@requires_inotify
+class TestFileWatcherWait:
+    @pytest.mark.asyncio
+    async def test_wakes_on_modification(self, tmp_path):
+        path = tmp_path / "log.txt"
+        path.write_text("first\n")
+        watcher = FileWatcher.create(str(path))
+        try:
+            waiter = asyncio.create_task(watcher.wait(timeout=5))
+            await asyncio.sleep(0)
+            with open(path, "a") as f:
+                f.write("second\n")
+            assert await waiter is True
+        finally:
+            watcher.close()
+
+    @pytest.mark.asyncio
+    async def test_times_out_when_idle(self, tmp_path):
+        path = tmp_path / "log.txt"
+        path.write_text("")
+        watcher = FileWatcher.create(str(path))
+        try:
+            assert await watcher.wait(timeout=0.05) is False
+        finally:
+            watcher.close()
+
+    @pytest.mark.asyncio
+    async def test_close_releases_waiter(self, tmp_path):
+        path = tmp_path / "log.txt"
+        path.write_text("")
+        watcher = FileWatcher.create(str(path))
+        waiter = asyncio.create_task(watcher.wait(timeout=5))
+        await asyncio.sleep(0)
+        watcher.close()
+        assert await waiter is True
+        # Closing twice is harmless
+        watcher.close()
@@ -482,3 +482,124 @@ class TestExtractUsernameFromDn:
         result = _extract_username_from_dn(dn, template)
         # Should return None if no uid/cn/sAMAccountName found
         assert result is None
+
+
+class TestMakeApp:
+    """Test application routing and settings"""
+
+    def _find(self, app, path):
+        from tornado.httputil import HTTPServerRequest
+        request = HTTPServerRequest(method="GET", uri=path)
+        return app.default_router.find_handler(request)
+
+    def test_compress_response_enabled_by_default(self):
+        from aird.main import make_app
+        from aird.handlers.base_handler import FeatureFlagGZipContentEncoding
+        app = make_app({"cookie_secret": "x"})
+        assert app.settings["compress_response"] is True
+        assert app.transforms == [FeatureFlagGZipContentEncoding]
+
+    def test_compress_response_can_be_turned_off(self):
+        from aird.main import make_app
+        app = make_app({"cookie_secret": "x", "compress_response": False})
+        assert app.transforms == []
+
+    def test_stream_route_requires_path(self):
+        from aird.main import make_app
+        from aird.handlers.api_handlers import FileStreamHandler
+        app = make_app({"cookie_secret": "x"})
+        assert self._find(app, "/stream/log.txt").handler_class is FileStreamHandler
+        assert self._find(app, "/stream/") is None
+
+
+class TestInstallUvloop:
+    """Test optional uvloop event loop selection"""
+
+    def test_missing_uvloop_keeps_default_loop(self):
+        from aird.main import _install_uvloop
+        with patch.dict(sys.modules, {'uvloop': None}), \
+             patch('asyncio.set_event_loop_policy') as mock_set_policy:
+            assert _install_uvloop() is False
+            mock_set_policy.assert_not_called()
+
+    def test_installs_uvloop_policy_when_available(self):
+        from aird.main import _install_uvloop
+        fake_uvloop = MagicMock()
+        with patch.dict(sys.modules, {'uvloop': fake_uvloop}), \
+             patch('asyncio.set_event_loop_policy') as mock_set_policy:
+            assert _install_uvloop() is True
+            mock_set_policy.assert_called_once_with(fake_uvloop.EventLoopPolicy.return_value)
+
+
+class TestBindFirstFreePort:
+    """Test listening socket setup"""
+
+    def test_skips_port_in_use(self):
+        import socket
+        from aird.main import _bind_first_free_port
+        busy = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        busy.bind(("", 0))
+        busy.listen(1)
+        busy_port = busy.getsockname()[1]
+        sockets = []
+        try:
+            sockets, port = _bind_first_free_port(busy_port)
+            assert port > busy_port
+            assert all(s.getsockname()[1] == port for s in sockets)
+        finally:
+            for s in sockets:
+                s.close()
+            busy.close()
+
+    def test_gives_up_after_max_attempts(self):
+        from aird.main import _bind_first_free_port
+        with patch('tornado.netutil.bind_sockets', side_effect=OSError("in use")) as mock_bind:
+            with pytest.raises(OSError):
+                _bind_first_free_port(8000, max_attempts=3)
+            assert [call.args[0] for call in mock_bind.call_args_list] == [8000, 8001, 8002]
+
+
+class TestForkWorkers:
+    """Test multi-process worker setup"""
+
+    def test_single_worker_does_not_fork(self):
+        from aird.main import _fork_workers
+        with patch('tornado.process.fork_processes') as mock_fork:
+            assert _fork_workers(1) is True
+            mock_fork.assert_not_called()
+
+    def test_only_first_worker_is_primary(self):
+        from aird.main import _fork_workers
+        with patch('tornado.process.fork_processes') as mock_fork, \
+             patch('tornado.process.task_id', side_effect=[0, 2]):
+            assert _fork_workers(0) is True
+            assert _fork_workers(0) is False
+            mock_fork.assert_called_with(0)
+
+
+class TestLoadRuntimeSettings:
+    """Test re-reading admin settings from the database"""
+
+    def test_copies_flags_and_upload_config_into_constants(self):
+        import sqlite3
+        import aird.constants as constants
+        from aird.main import _init_db, _save_feature_flags, _save_upload_config, _load_runtime_settings
+        from aird.db import save_allowed_extensions
+
+        conn = sqlite3.connect(":memory:")
+        _init_db(conn)
+        _save_feature_flags(conn, {'file_delete': False})
+        _save_upload_config(conn, {'max_file_size_mb': 7, 'allow_all_file_types': 0})
+        save_allowed_extensions(conn, {'.txt'})
+
+        with patch.dict(constants.FEATURE_FLAGS, {'file_delete': True}), \
+             patch.dict(constants.UPLOAD_CONFIG), \
+             patch.object(constants, 'MAX_FILE_SIZE', 0), \
+             patch.object(constants, 'UPLOAD_ALLOWED_EXTENSIONS', {'.md'}):
+            _load_runtime_settings(conn)
+
+            assert constants.FEATURE_FLAGS['file_delete'] is False
+            assert constants.UPLOAD_CONFIG['max_file_size_mb'] == 7
+            assert constants.MAX_FILE_SIZE == 7 * 1024 * 1024
+            assert constants.UPLOAD_ALLOWED_EXTENSIONS == {'.txt'}
+        conn.close()
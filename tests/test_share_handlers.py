@@ -312,6 +312,19 @@ class TestTokenVerificationHandler:
             mock_write.assert_called_with({"error": "Invalid token"})
 
 
+    def test_verify_token_non_ascii_is_rejected(self):
+        handler = prepare_handler(TokenVerificationHandler(self.mock_app, self.mock_request))
+        handler.request.body = json.dumps({'token': 'sécret'}).encode('utf-8')
+        handler.set_status = MagicMock()
+
+        with patch_db_conn(MagicMock(), modules=['aird.handlers.share_handlers']), \
+             patch('aird.handlers.share_handlers.get_share_by_id', return_value={'secret_token': 'secret'}), \
+             patch.object(handler, 'write') as mock_write:
+
+            handler.post("share1")
+            handler.set_status.assert_called_with(403)
+            mock_write.assert_called_with({"error": "Invalid token"})
+
 class TestSharedListHandler:
     def setup_method(self):
         self.mock_app = MagicMock()
@@ -390,6 +403,22 @@ class TestSharedFileHandler:
             await handler.get("share1", "test.txt")
             mock_main_handler.serve_file.assert_awaited_with(handler, '/root/test.txt')
 
+    @pytest.mark.asyncio
+    async def test_shared_file_non_ascii_bearer_token_is_rejected(self):
+        handler = prepare_handler(SharedFileHandler(self.mock_app, self.mock_request))
+        handler.set_status = MagicMock()
+        handler.write = MagicMock()
+        handler.request.headers = {'Authorization': 'Bearer sécret'}
+
+        share_data = {'paths': ['test.txt'], 'share_type': 'static', 'secret_token': 'secret'}
+        with patch_db_conn(MagicMock(), modules=['aird.handlers.share_handlers']), \
+             patch('aird.handlers.share_handlers.get_share_by_id', return_value=share_data), \
+             patch('aird.handlers.share_handlers.is_share_expired', return_value=False):
+
+            await handler.get("share1", "test.txt")
+            handler.set_status.assert_called_with(403)
+            handler.write.assert_called_with("Access denied: Invalid or expired access token")
+
     @pytest.mark.asyncio
     async def test_shared_file_requires_token(self):
         handler = prepare_handler(SharedFileHandler(self.mock_app, self.mock_request))
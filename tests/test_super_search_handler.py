@@ -40,6 +40,14 @@ class TestSuperSearchWebSocketHandler:
             user = handler.get_current_user()
             assert user['username'] == 'token_user'
 
+    def test_auth_resolved_once_per_connection(self):
+        handler = SuperSearchWebSocketHandler(self.mock_app, self.mock_request)
+
+        with patch('aird.handlers.api_handlers.authenticate_request', return_value={'username': 'user'}) as mock_auth:
+            assert handler.get_current_user() == {'username': 'user'}
+            assert handler.get_current_user() == {'username': 'user'}
+        mock_auth.assert_called_once_with(handler)
+
     @pytest.mark.asyncio
     async def test_open_auth_failed(self):
         handler = SuperSearchWebSocketHandler(self.mock_app, self.mock_request)
@@ -13,6 +13,10 @@ from aird.utils.util import (
     get_file_icon,
     join_path,
     is_within_root,
+    safe_resolve,
+    nofollow_opener,
+    is_upload_staging_path,
+    clear_upload_staging_dir,
     is_valid_websocket_origin,
     WebSocketConnectionManager,
     FilterExpression,
@@ -130,6 +134,87 @@ class TestIsWithinRoot:
         with tempfile.TemporaryDirectory() as temp_dir:
             assert is_within_root(temp_dir, temp_dir) is True
 
+    def test_sibling_with_common_prefix(self):
+        """Test that a sibling sharing the root's name prefix is outside"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = os.path.join(temp_dir, "data")
+            sibling = os.path.join(temp_dir, "data2")
+            os.makedirs(root)
+            os.makedirs(sibling)
+
+            assert is_within_root(sibling, root) is False
+            assert is_within_root(os.path.join(sibling, "file.txt"), root) is False
+
+    def test_filesystem_root(self):
+        """Test that everything is within the filesystem root"""
+        assert is_within_root(os.path.abspath(os.sep + "tmp"), os.sep) is True
+
+    def test_repointed_root_symlink_is_not_cached(self):
+        """Test that a share root re-pointed elsewhere is resolved afresh"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old_target = os.path.join(temp_dir, "old")
+            new_target = os.path.join(temp_dir, "new")
+            os.makedirs(old_target)
+            os.makedirs(new_target)
+            link = os.path.join(temp_dir, "share")
+            os.symlink(old_target, link)
+            assert is_within_root(os.path.join(old_target, "f.txt"), link) is True
+
+            os.remove(link)
+            os.symlink(new_target, link)
+            assert is_within_root(os.path.join(old_target, "f.txt"), link) is False
+            assert is_within_root(os.path.join(new_target, "f.txt"), link) is True
+
+    def test_configured_root_uses_resolved_value(self):
+        """Test that the served root is not re-resolved on each call"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            real = os.path.realpath(temp_dir)
+            with patch('aird.config.ROOT_DIR', temp_dir), \
+                 patch('aird.config.REAL_ROOT_DIR', real), \
+                 patch('aird.utils.util.os.path.realpath', side_effect=os.path.realpath) as mock_realpath:
+                assert is_within_root(os.path.join(temp_dir, "f.txt"), temp_dir) is True
+            mock_realpath.assert_called_once_with(os.path.join(temp_dir, "f.txt"))
+
+
+class TestSafeResolve:
+    """Tests for safe_resolve function"""
+
+    def test_resolves_path_inside_root(self):
+        """Test that a path under root resolves to its real path"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            expected = os.path.join(os.path.realpath(temp_dir), "sub", "file.txt")
+            assert safe_resolve(temp_dir, "sub", "file.txt") == expected
+
+    def test_traversal_returns_none(self):
+        """Test that escaping root via .. is rejected"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            assert safe_resolve(temp_dir, "../../etc/passwd") is None
+
+    def test_symlink_out_of_root_returns_none(self):
+        """Test that a symlink pointing outside root is rejected"""
+        with tempfile.TemporaryDirectory() as temp_dir, tempfile.TemporaryDirectory() as outside:
+            os.symlink(outside, os.path.join(temp_dir, "link"))
+            assert safe_resolve(temp_dir, "link", "file.txt") is None
+
+
+class TestNofollowOpener:
+    """Tests for nofollow_opener"""
+
+    def test_opens_regular_file(self, tmp_path):
+        path = tmp_path / "file.txt"
+        path.write_text("data")
+        with open(path, "r", opener=nofollow_opener) as f:
+            assert f.read() == "data"
+
+    @pytest.mark.skipif(not hasattr(os, "O_NOFOLLOW"), reason="O_NOFOLLOW not available")
+    def test_refuses_symlink(self, tmp_path):
+        target = tmp_path / "file.txt"
+        target.write_text("data")
+        link = tmp_path / "link.txt"
+        os.symlink(target, link)
+        with pytest.raises(OSError):
+            open(link, "rb", opener=nofollow_opener)
+
 
 class TestIsValidWebsocketOrigin:
     """Tests for is_valid_websocket_origin function"""
@@ -182,6 +267,26 @@ class TestGetFilesInDirectory:
             assert "file1.txt" in filenames
             assert "file2.txt" in filenames
 
+    def test_directory_entries_marked(self):
+        """Test directories are flagged and have no size string"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "subdir"))
+            with open(os.path.join(temp_dir, "file1.txt"), 'w') as f:
+                f.write("test1")
+
+            files = {f['name']: f for f in get_files_in_directory(temp_dir)}
+
+            assert files["subdir"]["is_dir"] is True
+            assert files["subdir"]["size_str"] == "-"
+            assert files["file1.txt"]["is_dir"] is False
+            assert files["file1.txt"]["size_bytes"] == 5
+
+
+    def test_hides_upload_staging_folder(self, tmp_path):
+        """Test that partial uploads never show up in a listing"""
+        (tmp_path / ".aird_tmp").mkdir()
+        (tmp_path / "a.txt").write_text("a")
+        assert [f['name'] for f in get_files_in_directory(str(tmp_path))] == ["a.txt"]
 
 class TestIsVideoFile:
     """Tests for is_video_file function"""
@@ -235,6 +340,41 @@ class TestGetAllFilesRecursive:
             assert any("file1.txt" in p for p in paths)
             assert any("file2.txt" in p for p in paths)
 
+    def test_missing_directory_returns_empty(self):
+        """Test scanning a missing directory yields no files"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('builtins.print'):
+                files = get_all_files_recursive(os.path.join(temp_dir, "missing"))
+            assert files == []
+
+
+    def test_skips_upload_staging_folder(self, tmp_path):
+        """Test that share expansion doesn't pick up partial uploads"""
+        (tmp_path / ".aird_tmp").mkdir()
+        (tmp_path / ".aird_tmp" / "aird_upload_x").write_text("partial")
+        (tmp_path / "a.txt").write_text("a")
+        assert get_all_files_recursive(str(tmp_path)) == ["a.txt"]
+
+
+class TestUploadStaging:
+    """Tests for the upload staging folder helpers"""
+
+    def test_is_upload_staging_path(self, tmp_path):
+        assert is_upload_staging_path(str(tmp_path / ".aird_tmp"), str(tmp_path)) is True
+        assert is_upload_staging_path(str(tmp_path / ".aird_tmp" / "aird_upload_x"), str(tmp_path)) is True
+        assert is_upload_staging_path(str(tmp_path / "docs" / ".aird_tmp"), str(tmp_path)) is False
+        assert is_upload_staging_path(str(tmp_path / ".aird_tmp2"), str(tmp_path)) is False
+
+    def test_clear_upload_staging_dir(self, tmp_path):
+        staging = tmp_path / ".aird_tmp"
+        staging.mkdir()
+        (staging / "aird_upload_abc").write_text("partial")
+        (staging / "keep.txt").write_text("not ours")
+        assert clear_upload_staging_dir(str(tmp_path)) == 1
+        assert os.listdir(staging) == ["keep.txt"]
+
+    def test_clear_upload_staging_dir_missing(self, tmp_path):
+        assert clear_upload_staging_dir(str(tmp_path)) == 0
 
 class TestMatchesGlobPatterns:
     """Tests for matches_glob_patterns function"""
@@ -506,6 +646,24 @@ class TestGetCurrentFeatureFlags:
             conn.close()
 
 
+    def test_db_wins_with_several_workers(self):
+        """Test that another worker's admin change in the DB overrides stale memory"""
+        import aird.constants
+        original_flags = aird.constants.FEATURE_FLAGS.copy()
+        original_conn = aird.constants.DB_CONN
+
+        try:
+            aird.constants.FEATURE_FLAGS = {'file_delete': True, 'mem_flag': True}
+            aird.constants.DB_CONN = MagicMock()
+            with patch('aird.db._load_feature_flags', return_value={'file_delete': False}), \
+                 patch('aird.config.WORKERS', 4):
+                result = get_current_feature_flags()
+            assert result['file_delete'] is False
+            assert result['mem_flag'] is True
+        finally:
+            aird.constants.FEATURE_FLAGS = original_flags
+            aird.constants.DB_CONN = original_conn
+
 class TestGetCurrentWebsocketConfig:
     """Tests for get_current_websocket_config function"""
     
@@ -741,6 +899,18 @@ class TestFilterExpression:
 class TestWebSocketConnectionManager:
     """Tests for WebSocketConnectionManager class"""
     
+    @patch('aird.utils.util.tornado.ioloop.IOLoop')
+    def test_cleanup_timer_armed_by_first_connection(self, mock_ioloop):
+        """Test that the cleanup timer waits for a connection instead of import time"""
+        manager = WebSocketConnectionManager("test", default_max_connections=10)
+        mock_ioloop.current.return_value.call_later.assert_not_called()
+        
+        manager.add_connection(MagicMock())
+        manager.add_connection(MagicMock())
+        
+        mock_ioloop.current.return_value.call_later.assert_called_once()
+        assert mock_ioloop.current.return_value.call_later.call_args[0][0] == 60
+    
     @patch('aird.utils.util.tornado.ioloop.IOLoop')
     def test_add_connection(self, mock_ioloop):
         """Test adding a connection"""
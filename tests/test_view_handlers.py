@@ -3,10 +3,15 @@ import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 from aird.handlers.view_handlers import (
     RootHandler, MainHandler, EditViewHandler, CloudProvidersHandler, CloudFilesHandler, CloudDownloadHandler,
-    FourOhFourHandler, NoCacheStaticFileHandler
+    FourOhFourHandler, NoCacheStaticFileHandler, _plain_stream, _sendfile_body
 )
+from tornado.iostream import IOStream, SSLIOStream
 from aird.cloud import CloudProviderError
+import asyncio
+import gzip
+import os
 import json
+import socket
 
 class TestRootHandler:
     def setup_method(self):
@@ -75,27 +80,19 @@ class TestMainHandler:
             mock_write.assert_called_with("File not found: The requested file may have been moved or deleted")
 
     @pytest.mark.asyncio
-    async def test_serve_file_download_compression(self):
+    async def test_serve_file_download_compression(self, tmp_path):
         handler = MainHandler(self.mock_app, self.mock_request)
         handler._current_user = {'username': 'user'}
         
         handler.get_argument = MagicMock(return_value='true')
+        file_path = tmp_path / "file.txt"
+        content = b"line of log text\n" * 10000
+        file_path.write_bytes(content)
         
-        with patch('os.path.abspath', return_value='/root/file.txt'), \
+        with patch('os.path.abspath', return_value=str(file_path)), \
              patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
-             patch('os.path.isdir', return_value=False), \
-             patch('os.path.isfile', return_value=True), \
              patch('aird.handlers.view_handlers.is_feature_enabled', return_value=True), \
-             patch('mimetypes.guess_type', return_value=('text/plain', None)), \
-             patch('builtins.open', new_callable=MagicMock) as mock_open, \
-             patch('shutil.copyfileobj') as mock_copy:
-            
-            mock_file = MagicMock()
-            mock_open.return_value.__enter__.return_value = mock_file
-            
-            def side_effect(f_in, f_out):
-                 f_out.write(b'compressed')
-            mock_copy.side_effect = side_effect
+             patch('mimetypes.guess_type', return_value=('text/plain', None)):
 
             with patch.object(handler, 'set_header') as mock_header, \
                  patch.object(handler, 'write') as mock_write, \
@@ -104,10 +101,10 @@ class TestMainHandler:
                 await handler.get("file.txt")
                 
                 mock_header.assert_any_call('Content-Encoding', 'gzip')
-                # Check that write was called with gzip data (magic bytes)
-                args = mock_write.call_args[0]
-                assert len(args) == 1
-                assert args[0].startswith(b'\x1f\x8b')
+                # Body is streamed in several gzip pieces that form one valid stream
+                body = b"".join(call.args[0] for call in mock_write.call_args_list)
+                assert body.startswith(b'\x1f\x8b')
+                assert gzip.decompress(body) == content
 
     @pytest.mark.asyncio
     async def test_serve_file_download_no_compression(self):
@@ -124,7 +121,7 @@ class TestMainHandler:
              patch('mimetypes.guess_type', return_value=('image/png', None)), \
              patch('aird.handlers.view_handlers.MMapFileHandler.serve_file_chunk', return_value=AsyncMock()) as mock_serve_chunk:
             
-            async def async_gen(path):
+            async def async_gen(path, *args, **kwargs):
                 yield b'image_data'
             mock_serve_chunk.side_effect = async_gen
 
@@ -136,6 +133,154 @@ class TestMainHandler:
                 
                 mock_write.assert_called_with(b'image_data')
 
+    @pytest.mark.asyncio
+    async def test_serve_file_download_sets_content_length(self, tmp_path):
+        handler = MainHandler(self.mock_app, self.mock_request)
+        handler._current_user = {'username': 'user'}
+        
+        handler.get_argument = MagicMock(return_value='true')
+        file_path = tmp_path / "image.png"
+        file_path.write_bytes(b'\x89PNG' + b'\0' * 1000)
+        
+        with patch('os.path.abspath', return_value=str(file_path)), \
+             patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.view_handlers.is_feature_enabled', return_value=True):
+
+            with patch.object(handler, 'set_header') as mock_header, \
+                 patch.object(handler, 'write') as mock_write, \
+                 patch.object(handler, 'flush', new_callable=AsyncMock):
+                
+                await handler.get("image.png")
+                
+                mock_header.assert_any_call('Content-Length', '1004')
+                body = b"".join(call.args[0] for call in mock_write.call_args_list)
+                assert body == file_path.read_bytes()
+
+    @pytest.mark.asyncio
+    async def test_serve_file_download_stops_at_content_length_when_file_grows(self, tmp_path):
+        handler = MainHandler(self.mock_app, self.mock_request)
+        handler._current_user = {'username': 'user'}
+
+        handler.get_argument = MagicMock(return_value='true')
+        file_path = tmp_path / "app.log"
+        original = b'line\n' * 200
+        file_path.write_bytes(original)
+
+        def append_after_length(name, value):
+            # The log keeps growing after Content-Length has been decided
+            if name == 'Content-Length':
+                with open(file_path, 'ab') as f:
+                    f.write(b'more\n' * 50)
+
+        with patch('os.path.abspath', return_value=str(file_path)), \
+             patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.view_handlers.is_feature_enabled', return_value=True), \
+             patch('mimetypes.guess_type', return_value=('application/octet-stream', None)), \
+             patch.object(handler, 'set_header', side_effect=append_after_length), \
+             patch.object(handler, 'write') as mock_write, \
+             patch.object(handler, 'flush', new_callable=AsyncMock):
+
+            await handler.get("app.log")
+
+            body = b"".join(call.args[0] for call in mock_write.call_args_list)
+            assert body == original
+
+    @pytest.mark.asyncio
+    async def test_serve_file_compression_disabled_sends_plain_body(self, tmp_path):
+        handler = MainHandler(self.mock_app, self.mock_request)
+        handler._current_user = {'username': 'user'}
+
+        handler.get_argument = MagicMock(return_value='true')
+        file_path = tmp_path / "notes.txt"
+        file_path.write_text("plain text " * 100)
+
+        with patch('os.path.abspath', return_value=str(file_path)), \
+             patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.view_handlers.is_feature_enabled',
+                   side_effect=lambda name, default=None: name != "compression"), \
+             patch.object(handler, 'set_header') as mock_header, \
+             patch.object(handler, 'write') as mock_write, \
+             patch.object(handler, 'flush', new_callable=AsyncMock):
+
+            await handler.get("notes.txt")
+
+            assert ('Content-Encoding', 'gzip') not in [c.args for c in mock_header.call_args_list]
+            body = b"".join(call.args[0] for call in mock_write.call_args_list)
+            assert body == file_path.read_bytes()
+
+    @pytest.mark.asyncio
+    async def test_serve_file_download_uses_sendfile_on_plain_stream(self, tmp_path):
+        handler = MainHandler(self.mock_app, self.mock_request)
+        handler._current_user = {'username': 'user'}
+
+        handler.get_argument = MagicMock(return_value='true')
+        file_path = tmp_path / "image.png"
+        file_path.write_bytes(b'\x89PNG' + b'\0' * 1000)
+
+        with patch('os.path.abspath', return_value=str(file_path)), \
+             patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.view_handlers.is_feature_enabled', return_value=True), \
+             patch('aird.handlers.view_handlers._plain_stream', return_value=MagicMock()), \
+             patch('aird.handlers.view_handlers._sendfile_body', new_callable=AsyncMock, return_value=True) as mock_sendfile, \
+             patch.object(handler, 'set_header'), \
+             patch.object(handler, 'write') as mock_write:
+
+            await handler.get("image.png")
+
+            assert mock_sendfile.call_args.args[2:] == (str(file_path), 1004)
+            mock_write.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_sendfile_body_writes_file_to_socket(self, tmp_path):
+        file_path = tmp_path / "blob.bin"
+        file_path.write_bytes(b'x' * 200000)
+        left, right = socket.socketpair()
+        stream = IOStream(left)
+        handler = MagicMock()
+        handler.flush = AsyncMock()
+        handler.request.connection._expected_content_remaining = 200000
+        try:
+            receiver = asyncio.get_running_loop().run_in_executor(
+                None, lambda: b"".join(iter(lambda: right.recv(65536), b"")))
+            assert await _sendfile_body(handler, stream, str(file_path), 200000) is True
+            stream.close()
+            assert await receiver == file_path.read_bytes()
+            assert handler.request.connection._expected_content_remaining == 0
+        finally:
+            right.close()
+
+    @pytest.mark.asyncio
+    async def test_sendfile_body_declines_when_body_is_transformed(self, tmp_path):
+        file_path = tmp_path / "log.txt"
+        file_path.write_text("hello")
+        handler = MagicMock()
+        handler.flush = AsyncMock()
+        # Content-Length was dropped, e.g. by the gzip transform
+        handler.request.connection._expected_content_remaining = None
+        assert await _sendfile_body(handler, MagicMock(), str(file_path), 5) is False
+
+    @pytest.mark.asyncio
+    async def test_sendfile_body_declines_without_loop_support(self, tmp_path):
+        file_path = tmp_path / "log.txt"
+        file_path.write_text("hello")
+        handler = MagicMock()
+        handler.flush = AsyncMock()
+        handler.request.connection._expected_content_remaining = 5
+
+        class StubLoop(asyncio.AbstractEventLoop):
+            pass
+
+        with patch('asyncio.get_running_loop', return_value=StubLoop()):
+            assert await _sendfile_body(handler, MagicMock(), str(file_path), 5) is False
+        # Nothing was committed, so the caller can still stream the body
+        handler.flush.assert_not_called()
+
+    def test_plain_stream_rejects_non_tcp_streams(self):
+        handler = MagicMock()
+        assert _plain_stream(handler) is None
+        handler.request.connection.stream = MagicMock(spec=SSLIOStream)
+        assert _plain_stream(handler) is None
+
     @pytest.mark.asyncio
     async def test_serve_file_download_disabled(self):
         handler = MainHandler(self.mock_app, self.mock_request)
@@ -246,6 +391,142 @@ class TestMainHandler:
             mock_write.assert_called_with(b"content")
 
 
+    @pytest.mark.asyncio
+    async def test_serve_file_raw_preview_truncated(self, tmp_path):
+        handler = MainHandler(self.mock_app, self.mock_request)
+        handler._current_user = {'username': 'user'}
+        file_path = tmp_path / "big.log"
+        file_path.write_bytes(b"0123456789" * 10)
+
+        def get_arg(name, default=None):
+            if name == 'mode': return 'raw'
+            if name == 'preview': return '1'
+            return default
+        handler.get_argument = get_arg
+
+        with patch('os.path.abspath', return_value=str(file_path)), \
+             patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
+             patch('aird.handlers.view_handlers.MAX_PREVIEW_SIZE', 25), \
+             patch.object(handler, 'write') as mock_write, \
+             patch.object(handler, 'flush', new_callable=AsyncMock), \
+             patch.object(handler, 'set_header') as mock_header:
+
+            await handler.get("big.log")
+
+            body = b"".join(call.args[0] for call in mock_write.call_args_list)
+            assert body == b"0123456789" * 2 + b"01234"
+            mock_header.assert_any_call('X-Aird-Truncated', '1')
+
+    @pytest.mark.asyncio
+    async def test_serve_file_raw_preview_small_file(self, tmp_path):
+        handler = MainHandler(self.mock_app, self.mock_request)
+        handler._current_user = {'username': 'user'}
+        file_path = tmp_path / "small.log"
+        file_path.write_bytes(b"short")
+
+        def get_arg(name, default=None):
+            if name == 'mode': return 'raw'
+            if name == 'preview': return '1'
+            return default
+        handler.get_argument = get_arg
+
+        with patch('os.path.abspath', return_value=str(file_path)), \
+             patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
+             patch.object(handler, 'write') as mock_write, \
+             patch.object(handler, 'flush', new_callable=AsyncMock), \
+             patch.object(handler, 'set_header') as mock_header:
+
+            await handler.get("small.log")
+
+            mock_write.assert_called_with(b"short")
+            mock_header.assert_any_call('X-Aird-Truncated', '0')
+
+    @pytest.mark.asyncio
+    async def test_serve_file_raw_follows_symlink_resolved_up_front(self, tmp_path):
+        handler = MainHandler(self.mock_app, self.mock_request)
+        handler._current_user = {'username': 'user'}
+        target = tmp_path / "real.log"
+        target.write_bytes(b"linked")
+        link = tmp_path / "link.log"
+        os.symlink(target, link)
+        handler.get_argument = lambda name, default=None: 'raw' if name == 'mode' else default
+
+        with patch('aird.handlers.view_handlers.ROOT_DIR', str(tmp_path)), \
+             patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
+             patch.object(handler, 'write') as mock_write, \
+             patch.object(handler, 'flush', new_callable=AsyncMock), \
+             patch.object(handler, 'set_header'):
+
+            await handler.get("link.log")
+
+            mock_write.assert_called_with(b"linked")
+
+    @pytest.mark.asyncio
+    async def test_serve_file_raw_refuses_file_swapped_for_symlink(self, tmp_path):
+        handler = MainHandler(self.mock_app, self.mock_request)
+        handler._current_user = {'username': 'user'}
+        secret = tmp_path / "secret.txt"
+        secret.write_bytes(b"secret")
+        swapped = tmp_path / "report.log"
+        os.symlink(secret, swapped)
+        handler.get_argument = lambda name, default=None: 'raw' if name == 'mode' else default
+
+        # The path resolved at validation time is now a symlink
+        with patch('aird.handlers.view_handlers.ROOT_DIR', str(tmp_path)), \
+             patch('os.path.realpath', return_value=str(swapped)), \
+             patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
+             patch.object(handler, 'write') as mock_write, \
+             patch.object(handler, 'flush', new_callable=AsyncMock), \
+             patch.object(handler, 'set_status') as mock_status, \
+             patch.object(handler, 'set_header'):
+
+            await handler.get("report.log")
+
+            mock_status.assert_called_with(500)
+            assert all(b"secret" not in call.args[0] for call in mock_write.call_args_list if isinstance(call.args[0], bytes))
+
+    @pytest.mark.asyncio
+    async def test_upload_staging_folder_is_not_served(self, tmp_path):
+        handler = MainHandler(self.mock_app, self.mock_request)
+        handler._current_user = {'username': 'user'}
+        (tmp_path / ".aird_tmp").mkdir()
+        (tmp_path / ".aird_tmp" / "aird_upload_x").write_bytes(b"partial")
+        handler.get_argument = lambda name, default=None: 'raw' if name == 'mode' else default
+
+        with patch('aird.handlers.view_handlers.ROOT_DIR', str(tmp_path)), \
+             patch.object(handler, 'write') as mock_write, \
+             patch.object(handler, 'set_status') as mock_status, \
+             patch.object(handler, 'render') as mock_render:
+
+            await handler.get(".aird_tmp/aird_upload_x")
+            mock_status.assert_called_with(404)
+            await handler.get(".aird_tmp")
+            mock_status.assert_called_with(404)
+
+            mock_render.assert_not_called()
+            assert all(call.args[0] != b"partial" for call in mock_write.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_serve_file_rechecks_root_after_resolving(self, tmp_path):
+        handler = MainHandler(self.mock_app, self.mock_request)
+        root = tmp_path / "root"
+        root.mkdir()
+        secret = tmp_path / "secret.txt"
+        secret.write_bytes(b"secret")
+        # Swapped for a link out of root after the caller's own check passed
+        os.symlink(secret, root / "report.log")
+        handler.get_argument = lambda name, default=None: 'raw' if name == 'mode' else default
+
+        with patch('aird.handlers.view_handlers.ROOT_DIR', str(root)), \
+             patch.object(handler, 'write') as mock_write, \
+             patch.object(handler, 'set_status') as mock_status, \
+             patch.object(handler, 'set_header'):
+
+            await MainHandler.serve_file(handler, str(root / "report.log"))
+
+            mock_status.assert_called_with(403)
+            assert all(b"secret" not in call.args[0] for call in mock_write.call_args_list if isinstance(call.args[0], bytes))
+
 class TestEditViewHandler:
     def setup_method(self):
         self.mock_app = MagicMock()
@@ -357,56 +638,26 @@ class TestEditViewHandler:
             mock_render.assert_called()
 
     @pytest.mark.asyncio
-    async def test_edit_mmap_read(self):
+    async def test_edit_view_does_not_read_file(self):
         handler = EditViewHandler(self.mock_app, self.mock_request)
         handler._current_user = {'username': 'user'}
         
         with patch('aird.handlers.view_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.abspath', return_value='/root/large.txt'), \
+             patch('os.path.abspath', return_value='/root/notes.md'), \
              patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
              patch('os.path.isfile', return_value=True), \
              patch('os.path.getsize', return_value=1000000), \
-             patch('aird.handlers.view_handlers.MMapFileHandler.should_use_mmap', return_value=True), \
-             patch('builtins.open', new_callable=MagicMock) as mock_open, \
-             patch('mmap.mmap', new_callable=MagicMock) as mock_mmap, \
-             patch.object(handler, 'render') as mock_render:
-            
-            mock_mm = MagicMock()
-            mock_mm.__getitem__.return_value = b"content"
-            mock_mm.__enter__.return_value = mock_mm
-            mock_mmap.return_value = mock_mm
-            
-            await handler.get("large.txt")
-            mock_render.assert_called()
-            assert mock_render.call_args[1]['full_file_content'] == "content"
-
-    @pytest.mark.asyncio
-    async def test_edit_fallback_read(self):
-        handler = EditViewHandler(self.mock_app, self.mock_request)
-        handler._current_user = {'username': 'user'}
-        
-        with patch('aird.handlers.view_handlers.is_feature_enabled', return_value=True), \
-             patch('os.path.abspath', return_value='/root/file.txt'), \
-             patch('aird.handlers.view_handlers.is_within_root', return_value=True), \
-             patch('os.path.isfile', return_value=True), \
-             patch('os.path.getsize', return_value=100), \
-             patch('aird.handlers.view_handlers.MMapFileHandler.should_use_mmap', return_value=False), \
-             patch('aiofiles.open', new_callable=MagicMock) as mock_open, \
+             patch('aiofiles.open') as mock_aio_open, \
+             patch('builtins.open') as mock_open, \
+             patch('aird.handlers.view_handlers.get_current_feature_flags', return_value={}), \
              patch.object(handler, 'render') as mock_render:
             
-            cm1 = MagicMock()
-            cm1.__aenter__.side_effect = OSError("Read failed")
-            
-            mock_file_success = AsyncMock()
-            mock_file_success.read.return_value = "content"
-            cm2 = MagicMock()
-            cm2.__aenter__.return_value = mock_file_success
-            
-            mock_open.side_effect = [cm1, cm2]
-            
-            await handler.get("file.txt")
-            mock_render.assert_called()
-            assert mock_render.call_args[1]['full_file_content'] == "content"
+            await handler.get("notes.md")
+            # The page fetches ?mode=raw itself
+            mock_aio_open.assert_not_called()
+            mock_open.assert_not_called()
+            assert 'full_file_content' not in mock_render.call_args[1]
+            assert mock_render.call_args[1]['is_markdown'] is True
 
 class TestCloudProvidersHandler:
     def setup_method(self):